@@ -2,15 +2,14 @@
 # Git-Onto-Logic Query Script
 # Author: Saayella
 # --------------------------------------------------------
-from rdflib import Graph, Namespace
+from rdflib import Namespace
 
-# === Load the populated ontology ===
-file_path = "ontology/git-onto-logic-populated.owl"
+from graph_store import open_store
 
-g = Graph()
-g.parse(file_path, format="xml")
+# === Load the populated ontology (backend chosen as in graph_store.py) ===
+store = open_store()
 
-print(f"✅ Loaded ontology with {len(g)} triples")
+print(f"✅ Loaded ontology with {len(store)} triples ({store.backend})")
 
 # === Define namespace ===
 GIT = Namespace("http://example.org/git-onto-logic#")
@@ -39,7 +38,7 @@ SELECT ?user (COUNT(DISTINCT ?repo) AS ?repoCount)
 WHERE {
   ?commit a git:Commit ;
            git:authoredBy ?user ;
-           git:onBranch ?branch .
+           ^git:hasCommit ?branch .
   ?repo git:hasBranch ?branch .
 }
 GROUP BY ?user
@@ -65,7 +64,7 @@ PREFIX git: <http://example.org/git-onto-logic#>
 SELECT ?commit ?branch
 WHERE {
   ?commit a git:SecurityCommit ;
-           git:onBranch ?branch .
+           ^git:hasCommit ?branch .
   # Optionally restrict to commits merged into a specific branch:
   # ?branch git:mergedInto git:masterBranch .
 }
@@ -77,7 +76,7 @@ WHERE {
 def run_query(label, q):
     print(f"\n🔍 {label}")
     print("-" * (len(label) + 3))
-    results = g.query(q)
+    results = store.query(q)
     if not results:
         print("No results found.")
         return
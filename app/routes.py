@@ -1,15 +1,39 @@
+from collections import Counter
 from flask import Blueprint, render_template, request
 from owlready2 import get_ontology
 import os
 
+from graph_store import default_backend, open_store
+from query_cache import default_cache
+
 bp = Blueprint("routes", __name__)
 
 # --------------------------------------------------------------
 # Load the populated ontology once at startup
+# (GIT_ONTO_GRAPH may point at the N-Triples file of populate_graph.py --bulk;
+# owlready2 detects the format)
 # --------------------------------------------------------------
-ONTOLOGY_PATH = os.path.join(os.path.dirname(__file__), "../ontology/git-onto-logic-populated.owl")
+ONTOLOGY_PATH = os.getenv("GIT_ONTO_GRAPH") or os.path.join(os.path.dirname(__file__), "../ontology/git-onto-logic-populated.owl")
 ONTOLOGY_PATH = os.path.abspath(ONTOLOGY_PATH)
-onto = get_ontology(f"file://{ONTOLOGY_PATH}").load()
+# Quadstore of populate_graph.py --db; used in place of the file when set
+ONTOLOGY_DB = os.getenv("GIT_ONTO_DB")
+if ONTOLOGY_DB:
+    from incremental_populate import ONTO_IRI, load_world
+    onto = load_world(ONTOLOGY_DB).get_ontology(ONTO_IRI)
+else:
+    onto = get_ontology(f"file://{ONTOLOGY_PATH}").load()
+
+# SPARQL store behind /sparql, opened on first use; the owlready2 backend
+# queries the ontology loaded above rather than a second copy
+_sparql_store = None
+
+def sparql_store():
+    global _sparql_store
+    if _sparql_store is None:
+        backend = default_backend()
+        _sparql_store = open_store(backend, world=onto.world if backend == "owlready2" else None,
+                                   path=ONTOLOGY_PATH)
+    return _sparql_store
 
 def val(prop):
     """Return a consistent single value whether the property is a list or a scalar."""
@@ -82,20 +106,9 @@ def view_branch_commits(repo, branch):
         # Branch not found under this repo
         return render_template("commits.html", branch=branch, commits=[], repo=repo)
 
-    # 3) gather commits:
-    #    - commits directly attached via hasCommit
-    #    - commits that reference this branch via onBranch
-    #    - keep only commits that are associated with this repo (their onBranch contains a branch in repo_obj.hasBranch)
-    linked = set(getattr(target_branch, "hasCommit", []))
-
-    # include commits that reference this branch via onBranch
-    for c in onto.Commit.instances():
-        if target_branch in getattr(c, "onBranch", []):
-            linked.add(c)
-
-    # repo-level filter (commit must be on at least one branch of the current repo)
-    repo_branches = set(getattr(repo_obj, "hasBranch", []))
-    linked = [c for c in linked if repo_branches.intersection(set(getattr(c, "onBranch", [])))]
+    # 3) gather commits: onBranch is the inverse of hasCommit, so the
+    #    branch's hasCommit (an indexed lookup by subject) holds them all
+    linked = getattr(target_branch, "hasCommit", [])
 
     # 4) convert to view-model
     commits = []
@@ -116,33 +129,35 @@ def view_branch_commits(repo, branch):
 
 @bp.route("/authors")
 def authors():
-    """List all authors and their commit counts."""
+    """List all authors and their commit counts (materialised by populate_graph.py)."""
     authors = []
+    counts = None  # recounted once for graphs populated without commitCount
     for a in onto.User.instances():
         name = val(getattr(a, "userLogin", "(unknown)"))
-        count = sum(
-            1 for c in onto.Commit.instances()
-            if getattr(c, "authoredBy", None) and c.authoredBy[0] == a
-        )
+        count = val(getattr(a, "commitCount", None))
+        if count is None:
+            if counts is None:
+                counts = Counter(c.authoredBy[0] for c in onto.Commit.instances() if getattr(c, "authoredBy", None))
+            count = counts[a]
         authors.append({"name": name, "count": count})
     return render_template("author.html", authors=sorted(authors, key=lambda x: x["name"]))
 
 
 @bp.route("/sparql", methods=["GET", "POST"])
 def sparql():
-    """Run SPARQL queries directly on the already-loaded ontology."""
+    """Run SPARQL queries directly on the already-loaded ontology (results cached per graph version)."""
     results, query, error = [], "", None
     if request.method == "POST":
         query = request.form["query"].strip()
         if query:
             try:
-                g = onto.world.as_rdflib_graph()
-                results = [row for row in g.query(query)]
+                results = default_cache().query(sparql_store(), query)
             except Exception as e:
                 error = f"SPARQL error: {e.__class__.__name__} – {str(e)}"
         else:
             error = "Query cannot be empty."
-    return render_template("sparql.html", query=query, results=results, error=error)
+    return render_template("sparql.html", query=query, results=results, error=error,
+                           cache=default_cache().stats())
 
 
 @bp.route("/validate")
@@ -1,6 +1,7 @@
 # app_cli.py
 from ontology.ontology_v1 import onto
-from rdflib import Graph
+from graph_store import open_store
+from query_cache import default_cache
 
 # Load ontology
 onto.load(file="ontology/git-onto-logic.owl")
@@ -163,13 +164,13 @@ def validate_ontology():
 def run_sparql_query():
     """Run custom SPARQL queries directly."""
     print("\n=== SPARQL Query Interface ===")
-    g = Graph()
-    g.parse("ontology/git-onto-logic.owl")
     query = input("Enter SPARQL query:\n> ")
     try:
-        results = g.query(query)
+        cache = default_cache()
+        results = cache.query(open_store(), query)
         for row in results:
             print(row)
+        print(f"(query cache: {cache.summary()})")
     except Exception as e:
         print(f"Error executing query: {e}")
     print("--------------------")
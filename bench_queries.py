@@ -0,0 +1,257 @@
+# --------------------------------------------------------
+# Benchmark of the run_queries.py suite on synthetic graphs
+# --------------------------------------------------------
+# Usage:
+#   python bench_queries.py                          # 10k and 100k commits
+#   python bench_queries.py --sizes 10000,100000,1000000 --repeat 10
+#   python bench_queries.py --save-baseline          # record the reference run
+#   python bench_queries.py --threshold 0.25         # fail past +25% median
+#
+# For each size a synthetic dataset (data/*.json, deterministic for a seed)
+# is generated and populated with populate_graph.py --bulk --snapshot under
+# .cache/bench/; both are reused by later runs, and the graph is rebuilt
+# when the schema or the population code changes. Every query of QUERIES
+# then runs in a fresh worker process on the snapshot: after the warm-up
+# runs, the timed runs give the median and p95 latency, and the process's
+# peak RSS is the query's peak memory. The query cache is not involved.
+#
+# Results go to a JSON file. With a baseline (written by --save-baseline)
+# each query's median is compared with the baseline's; a query slower than
+# baseline × (1 + threshold), by more than --min-ms, is a regression and
+# makes the run exit with status 1.
+import argparse, hashlib, json, math, os, platform, random, statistics, subprocess, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from data_io import peak_rss_mb
+from graph_store import open_store
+import run_queries
+
+ROOT = Path(__file__).resolve().parent
+BENCH_DIR = Path(".cache/bench")
+DEFAULT_SIZES = "10000,100000"
+# Files whose changes invalidate a populated benchmark graph.
+GRAPH_INPUTS = ["ontology/git-onto-logic-redesigned.owl", "populate_graph.py", "bulk_populate.py"]
+
+# === Synthetic dataset shape ===
+COMMITS_PER_REPO = 2500
+BRANCHES = ["main", "develop"] + [f"feature/f{i}" for i in range(6)]
+PATHS_PER_REPO = 300
+COMMITS_PER_USER = 200
+COMMITS_PER_ISSUE = 50
+MESSAGES = ["fix bug", "refactor parser", "add tests", "update docs", "security: escape input",
+            "bump dependency", "patch vulnerability in auth", "merge branch"]
+
+
+# -----------------------------
+# Synthetic data
+# -----------------------------
+def generate(data_dir, commits, seed):
+    """Write data/*.json (NDJSON) for `commits` commits, spread over repos of COMMITS_PER_REPO."""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    n_repos = max(1, math.ceil(commits / COMMITS_PER_REPO))
+    logins = [f"user{i}" for i in range(max(10, commits // COMMITS_PER_USER))]
+    names = ["repos", "users", "branches", "commits", "commit_branches", "files", "issues", "pulls"]
+    out = {name: open(data_dir / f"{name}.json", "w", encoding="utf-8") for name in names}
+
+    def write(name, row):
+        out[name].write(json.dumps(row, separators=(",", ":")))
+        out[name].write("\n")
+
+    try:
+        for login in logins:
+            write("users", {"user_login": login, "user_id": 0, "user_url": f"https://github.com/{login}"})
+        for r in range(n_repos):
+            rng = random.Random(f"{seed}:{r}")
+            repo_id = 1000 + r
+            write("repos", {"repo_id": repo_id, "repo_name": f"bench/repo{r}", "repo_description": "",
+                            "repo_language": rng.choice(["Python", "Go", None]), "repo_stars": rng.randrange(1000),
+                            "repo_forks": rng.randrange(100), "repo_url": ""})
+            count = min(COMMITS_PER_REPO, commits - r * COMMITS_PER_REPO)
+            shas = []
+            for k in range(count):
+                sha = f"{repo_id:08x}{k:032x}"
+                parents = shas[-1:]
+                if k % 20 == 19:
+                    parents.append(shas[rng.randrange(len(shas))])
+                branch = rng.choice(BRANCHES)
+                write("commits", {"repo_id": repo_id, "branch_name": branch, "commit_sha": sha,
+                                  "commit_message": rng.choice(MESSAGES),
+                                  "commit_date": f"2024-{1 + k % 12:02d}-{1 + k % 28:02d}T00:00:00Z",
+                                  "commit_author_login": rng.choice(logins),
+                                  "commit_committer_login": rng.choice(logins),
+                                  "commit_parent_count": len(parents), "commit_parents": parents,
+                                  "is_initial": not parents})
+                if branch != "main":
+                    write("commit_branches", {"repo_id": repo_id, "branch_name": "main", "commit_sha": sha})
+                for path in rng.sample(range(PATHS_PER_REPO), rng.randint(1, 3)):
+                    write("files", {"repo_id": repo_id, "commit_sha": sha, "file_name": f"src/module{path}.py",
+                                    "file_status": "modified", "file_additions": 1, "file_deletions": 1,
+                                    "file_changes": 2})
+                shas.append(sha)
+            for name in BRANCHES:
+                write("branches", {"repo_id": repo_id, "branch_name": name, "commit_sha": shas[-1],
+                                   "is_default": name == "main"})
+            for i in range(count // COMMITS_PER_ISSUE):
+                write("issues", {"repo_id": repo_id, "issue_id": repo_id * 100000 + i, "issue_number": i,
+                                 "title": f"issue {i}", "state": rng.choice(["open", "closed"]),
+                                 "user_login": rng.choice(logins)})
+                merged = rng.random() < 0.5
+                write("pulls", {"repo_id": repo_id, "pr_id": repo_id * 100000 + i, "number": i,
+                                "title": f"pull request {i}", "state": "closed" if merged else "open",
+                                "merged_at": "2024-06-01T00:00:00Z" if merged else None,
+                                "user_login": rng.choice(logins), "base_branch": "main",
+                                "head_branch": rng.choice(BRANCHES[1:])})
+    finally:
+        for f in out.values():
+            f.close()
+
+
+def graph_inputs_hash():
+    h = hashlib.sha256()
+    for name in GRAPH_INPUTS:
+        h.update((ROOT / name).read_bytes())
+    return h.hexdigest()
+
+
+def prepare(commits, seed):
+    """Snapshot of the benchmark graph for `commits` commits, generated and populated when missing or stale."""
+    work = BENCH_DIR / f"commits-{commits}-seed{seed}"
+    data_marker = work / "data" / ".complete"
+    if not data_marker.exists():
+        print(f"🧪 Generating {commits} commits in {work}/data")
+        generate(work / "data", commits, seed)
+        data_marker.touch()
+
+    snap = work / "graph.snap"
+    stamp = work / "graph.inputs"
+    inputs = graph_inputs_hash()
+    if not snap.exists() or not stamp.exists() or stamp.read_text().strip() != inputs:
+        print(f"🧪 Populating {work}")
+        (work / "ontology").mkdir(exist_ok=True)
+        schema = ROOT / GRAPH_INPUTS[0]
+        (work / GRAPH_INPUTS[0]).write_bytes(schema.read_bytes())
+        subprocess.run([sys.executable, str(ROOT / "populate_graph.py"), "--bulk", "--output", "graph.nt",
+                        "--snapshot", "graph.snap"], cwd=work, check=True, stdout=subprocess.DEVNULL)
+        (work / "graph.nt").unlink()
+        stamp.write_text(inputs + "\n")
+    return snap
+
+
+# -----------------------------
+# Timing
+# -----------------------------
+def percentile(samples, q):
+    """Nearest-rank percentile of `samples`."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def time_query(snap, query, repeat, warmup):
+    """Worker: latencies (ms) of `query` on the snapshot, its row count and the process's peak RSS."""
+    run_queries.store = open_store("snapshot", path=str(snap))
+    for _ in range(warmup):
+        run_queries.execute(query)
+    samples = []
+    for _ in range(repeat):
+        rows, elapsed = run_queries.execute(query)
+        samples.append(elapsed * 1000)
+    return {"rows": len(rows), "median_ms": statistics.median(samples), "p95_ms": percentile(samples, 0.95),
+            "peak_rss_mb": peak_rss_mb()}
+
+
+def bench(sizes, seed, repeat, warmup):
+    results = []
+    for commits in sizes:
+        snap = prepare(commits, seed)
+        triples = len(open_store("snapshot", path=str(snap)))
+        print(f"\n📏 {commits} commits, {triples} triples")
+        print(f"  {'#':>2}  {'median':>10}  {'p95':>10}  {'peak':>8}  query")
+        for i, (title, query) in enumerate(run_queries.QUERIES, 1):
+            # One process per query, so its peak RSS is its own.
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                result = pool.submit(time_query, snap, query, repeat, warmup).result()
+            results.append({"commits": commits, "triples": triples, "query": i, "title": title, **result})
+            print(f"  {i:>2}  {result['median_ms']:>8.1f}ms  {result['p95_ms']:>8.1f}ms  "
+                  f"{result['peak_rss_mb']:>6.0f}MB  {title}")
+    return results
+
+
+# -----------------------------
+# Baseline comparison
+# -----------------------------
+def regressions(results, baseline, threshold, min_ms):
+    """Results whose median exceeds the baseline's by more than `threshold` (and `min_ms`)."""
+    base = {(r["commits"], r["title"]): r for r in baseline["results"]}
+    slower = []
+    for r in results:
+        b = base.get((r["commits"], r["title"]))
+        if b is None:
+            continue
+        limit = b["median_ms"] * (1 + threshold)
+        if r["median_ms"] > limit and r["median_ms"] - b["median_ms"] > min_ms:
+            slower.append((r, b))
+    return slower
+
+
+def write_results(path, payload):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SPARQL query suite on synthetic graphs")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"comma-separated commit counts (default: {DEFAULT_SIZES})")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query (default: 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs per query first (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic data seed (default: 0)")
+    parser.add_argument("--output", type=Path, default=BENCH_DIR / "results.json",
+                        help="results file (default: %(default)s)")
+    parser.add_argument("--baseline", type=Path, default=BENCH_DIR / "baseline.json",
+                        help="baseline to compare with (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed median slowdown against the baseline, as a fraction (default: 0.2)")
+    parser.add_argument("--min-ms", type=float, default=2.0,
+                        help="ignore slowdowns smaller than this many ms (default: 2)")
+    args = parser.parse_args()
+    try:
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    except ValueError:
+        parser.error(f"--sizes must be comma-separated integers, got {args.sizes!r}")
+    if not sizes or min(sizes) < 1 or args.repeat < 1 or args.warmup < 0:
+        parser.error("--sizes must be positive, --repeat at least 1 and --warmup not negative")
+
+    started = time.perf_counter()
+    results = bench(sizes, args.seed, args.repeat, args.warmup)
+    payload = {"created": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+               "machine": platform.platform(), "seed": args.seed, "repeat": args.repeat,
+               "warmup": args.warmup, "results": results}
+    write_results(args.output, payload)
+    print(f"\n✅ Results written: {args.output} ({time.perf_counter() - started:.1f}s)")
+
+    if args.save_baseline:
+        write_results(args.baseline, payload)
+        print(f"✅ Baseline saved: {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"ℹ️ No baseline at {args.baseline}; run with --save-baseline to record one.")
+        return
+    slower = regressions(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold,
+                         args.min_ms)
+    if not slower:
+        print(f"✅ No query slower than the baseline by more than {args.threshold:.0%}")
+        return
+    print(f"❌ {len(slower)} of {len(results)} query timings slower than the baseline by more than "
+          f"{args.threshold:.0%}:")
+    for r, b in slower:
+        print(f"  • {r['commits']} commits, query {r['query']} ({r['title']}): "
+              f"{b['median_ms']:.1f}ms → {r['median_ms']:.1f}ms")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
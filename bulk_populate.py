@@ -0,0 +1,419 @@
+# --------------------------------------------------------
+# Bulk N-Triples population for populate_graph.py --bulk
+# --------------------------------------------------------
+# Writes the populated ontology straight from the data/*.json rows as
+# N-Triples lines, instead of creating each individual and property value
+# through owlready2 (one quadstore write per assignment) and serialising
+# the result as RDF/XML. The IRIs, classes, properties and literal
+# datatypes are the ones populate_graph.populate() produces, and
+# the schema triples of git-onto-logic-redesigned.owl are copied in first,
+# so the file loads as the same ontology in rdflib and owlready2.
+#
+# With --jobs N the rows are first split by repo_id into one shard per
+# repository; a process pool turns each shard into an N-Triples fragment
+# and the fragments are concatenated behind the schema and the users,
+# which are written once (deduplicated by login) by the parent process.
+# A commit shared by two repos (a fork crawled alongside its upstream) is
+# then described by both fragments; the duplicate lines are harmless.
+import json, os, shutil, sys, tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from rdflib import Graph
+
+from data_io import iter_records, peak_rss_mb
+from populate_graph import (DATA_DIR, SCHEMA_FILE, BranchResolver, StageReport, derive_aggregates, is_merged_pr,
+                            is_security_message, repo_iri, user_iri, branch_iri, commit_iri, file_iri, change_iri,
+                            issue_iri, pr_iri)
+
+GIT = "http://example.org/git-onto-logic#"
+RDF_TYPE = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+NAMED_INDIVIDUAL = "<http://www.w3.org/2002/07/owl#NamedIndividual>"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+# Characters N-Triples does not allow raw inside <...>; written as \uXXXX.
+_IRI_ESCAPES = {c: f"\\u{c:04X}" for c in [*range(0x21), *map(ord, '<>"{}|^`\\')]}
+_LITERAL_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+# Lines are handed to the file in chunks of this many.
+WRITE_CHUNK = 10000
+
+DATA_FILES = ["repos.json", "users.json", "branches.json", "commits.json", "commit_branches.json",
+              "files.json", "issues.json", "pulls.json"]
+
+
+def iri(name):
+    """N-Triples term for an individual, class or property of the ontology."""
+    return f"<{GIT}{name.translate(_IRI_ESCAPES)}>"
+
+
+def literal(value):
+    """N-Triples literal typed the way owlready2 stores Python values."""
+    if isinstance(value, bool):
+        return f'"{"true" if value else "false"}"^^<{XSD}boolean>'
+    if isinstance(value, int):
+        return f'"{value}"^^<{XSD}integer>'
+    return f'"{str(value).translate(_LITERAL_ESCAPES)}"^^<{XSD}string>'
+
+
+class NTriplesWriter:
+    """Buffered N-Triples output; every term is already formatted."""
+
+    def __init__(self, f):
+        self.f = f
+        self.count = 0
+        self._lines = []
+
+    def add(self, s, p, o):
+        self._lines.append(f"{s} {p} {o} .\n")
+        if len(self._lines) >= WRITE_CHUNK:
+            self.flush()
+
+    def individual(self, s, cls):
+        self.add(s, RDF_TYPE, NAMED_INDIVIDUAL)
+        self.add(s, RDF_TYPE, iri(cls))
+
+    def value(self, s, prop, value):
+        self.add(s, iri(prop), literal(value))
+
+    def link(self, s, prop, o):
+        self.add(s, iri(prop), o)
+
+    def raw(self, text):
+        self.flush()
+        self.f.write(text)
+        self.count += text.count("\n")
+
+    def append_file(self, path, count):
+        """Copy an N-Triples file of `count` lines to the output."""
+        self.flush()
+        with open(path, "r", encoding="utf-8") as f:
+            shutil.copyfileobj(f, self.f)
+        self.count += count
+
+    def flush(self):
+        self.f.writelines(self._lines)
+        self.count += len(self._lines)
+        self._lines = []
+
+
+def write_schema(out):
+    """Copy the schema (classes, properties, axioms) into the output."""
+    schema = Graph()
+    schema.parse(SCHEMA_FILE, format="xml")
+    out.raw(schema.serialize(format="nt"))
+
+
+def read_rows(data_dir, filename):
+    path = Path(data_dir) / filename
+    return iter_records(path) if path.exists() else []
+
+
+def write_users(out, users):
+    """Emit one User per login; returns {login: term}."""
+    user_map = {}
+    for u in users:
+        if u["user_login"] in user_map:
+            continue
+        user = iri(user_iri(u["user_login"]))
+        out.individual(user, "User")
+        out.value(user, "userLogin", u["user_login"])
+        out.value(user, "userURL", u.get("user_url", ""))
+        user_map[u["user_login"]] = user
+    return user_map
+
+
+def write_individuals(out, report, data_dir=DATA_DIR, logins=None):
+    """Emit the individuals populate_graph.populate() creates.
+
+    The data files are streamed one after the other; what stays in memory
+    is one term per individual (for linking and inference), not the rows.
+    With `logins` the User individuals are assumed written elsewhere and
+    only linked to.
+    """
+    repos    = report.rows(read_rows(data_dir, "repos.json"))
+    branches = report.rows(read_rows(data_dir, "branches.json"))
+    commits  = report.rows(read_rows(data_dir, "commits.json"))
+    files    = report.rows(read_rows(data_dir, "files.json"))
+    issues   = report.rows(read_rows(data_dir, "issues.json"))
+    prs      = report.rows(read_rows(data_dir, "pulls.json"))
+    memberships = report.rows(read_rows(data_dir, "commit_branches.json"))
+
+    repo_map = {}      # repo_id → term
+    branch_map = {}    # (repo_id, name) → term
+    commit_map = {}    # sha → term (including parent placeholders)
+    file_map = {}      # (repo_id, path) → term
+    parents = {}       # commit term → parent terms
+    described = set()  # terms whose data properties were written
+    merged = set()     # branch terms with a mergedInto link
+    linked_pairs = set()
+
+    # === Repositories ===
+    for r in repos:
+        repo = iri(repo_iri(r["repo_id"]))
+        if repo not in described:
+            described.add(repo)
+            out.individual(repo, "Repository")
+            out.value(repo, "repoName", r.get("repo_name", "Unknown"))
+            out.value(repo, "repoLanguage", r.get("repo_language") or "Unknown")
+            out.value(repo, "repoStars", int(r.get("repo_stars", 0)))
+            out.value(repo, "repoForks", int(r.get("repo_forks", 0)))
+        repo_map[r["repo_id"]] = repo
+    report("repos")
+
+    # === Users ===
+    if logins is None:
+        user_map = write_users(out, report.rows(read_rows(data_dir, "users.json")))
+        report("users")
+    else:
+        user_map = {login: iri(user_iri(login)) for login in logins}
+
+    # === Branches ===
+    for b in branches:
+        repo_id = b["repo_id"]
+        repo = repo_map.get(repo_id)
+        if not repo:
+            continue
+        branch = iri(branch_iri(repo_id, b["branch_name"]))
+        if branch not in described:
+            described.add(branch)
+            out.individual(branch, "Branch")
+            out.value(branch, "branchName", b["branch_name"])
+            out.value(branch, "isDefault", bool(b.get("is_default", False)))
+            out.link(repo, "hasBranch", branch)
+        branch_map[(repo_id, b["branch_name"])] = branch
+    report("branches")
+
+    def commit_term(sha):
+        commit = commit_map.get(sha)
+        if not commit:
+            commit = commit_map[sha] = iri(commit_iri(sha))
+            out.individual(commit, "Commit")
+            parents[commit] = set()
+        return commit
+
+    def link_branch(branch_key, branch, commit, sha):
+        out.link(branch, "hasCommit", commit)
+        linked_pairs.add((branch_key, sha))
+
+    # === Commits ===
+    for c in commits:
+        branch_key = (c["repo_id"], c["branch_name"])
+        branch = branch_map.get(branch_key)
+        if not branch:
+            continue
+        sha = c["commit_sha"]
+        commit = commit_term(sha)
+        if (branch_key, sha) not in linked_pairs:
+            link_branch(branch_key, branch, commit, sha)
+        if commit in described:
+            continue
+        described.add(commit)
+
+        out.value(commit, "commitSHA", sha)
+        out.value(commit, "message", c.get("commit_message", ""))
+        out.value(commit, "commitDate", c.get("commit_date", ""))
+        out.value(commit, "isInitial", bool(c.get("is_initial", False)))
+
+        author_login = c.get("commit_author_login")
+        committer_login = c.get("commit_committer_login")
+        if author_login and author_login in user_map:
+            out.link(commit, "authoredBy", user_map[author_login])
+        if committer_login and committer_login in user_map:
+            out.link(commit, "committedBy", user_map[committer_login])
+
+        for psha in c.get("commit_parents", []):
+            parent = commit_term(psha)
+            if parent not in parents[commit]:
+                parents[commit].add(parent)
+                out.link(commit, "parent", parent)
+
+        if is_security_message(c.get("commit_message", "")):
+            out.add(commit, RDF_TYPE, iri("SecurityCommit"))
+    report("commits")
+
+    # === Other branches of each commit ===
+    for m in memberships:
+        branch_key = (m["repo_id"], m["branch_name"])
+        if (branch_key, m["commit_sha"]) in linked_pairs:
+            continue
+        branch = branch_map.get(branch_key)
+        commit = commit_map.get(m["commit_sha"])
+        if branch and commit:
+            link_branch(branch_key, branch, commit, m["commit_sha"])
+    report("commit_branches")
+
+    # === Files ===
+    for fobj in files:
+        commit = commit_map.get(fobj["commit_sha"])
+        if not commit:
+            continue
+        repo_id = fobj["repo_id"]
+        path = sys.intern(fobj["file_name"])
+        file_ind = file_map.get((repo_id, path))
+        if file_ind is None:
+            file_ind = file_map[(repo_id, path)] = iri(file_iri(repo_id, path))
+            out.individual(file_ind, "File")
+            out.value(file_ind, "fileName", path)
+            if repo_id in repo_map:
+                out.link(repo_map[repo_id], "containsFile", file_ind)
+        change = iri(change_iri(fobj["commit_sha"], path))
+        if change not in described:
+            described.add(change)
+            out.individual(change, "FileChange")
+            out.value(change, "fileStatus", fobj.get("file_status", "modified"))
+            out.value(change, "fileChanges", int(fobj.get("file_changes", 0)))
+            out.link(change, "inCommit", commit)
+            out.link(change, "ofFile", file_ind)
+    report("files")
+
+    # === Issues ===
+    for iobj in issues:
+        repo = repo_map.get(iobj["repo_id"])
+        if not repo:
+            continue
+        issue = iri(issue_iri(iobj["issue_id"]))
+        out.individual(issue, "Issue")
+        out.value(issue, "title", iobj.get("title", "Untitled"))
+        out.value(issue, "state", iobj.get("state", "open"))
+        out.link(repo, "hasIssue", issue)
+        user_login = iobj.get("user_login")
+        if user_login and user_login in user_map:
+            out.link(issue, "openedBy", user_map[user_login])
+    report("issues")
+
+    # === Pull requests ===
+    branch_resolver = BranchResolver(branch_map)
+    for pobj in prs:
+        repo = repo_map.get(pobj["repo_id"])
+        if not repo:
+            continue
+        pr = iri(pr_iri(pobj["pr_id"]))
+        out.individual(pr, "PullRequest")
+        out.value(pr, "title", pobj.get("title", "Untitled PR"))
+        out.value(pr, "state", pobj.get("state", "open"))
+        merged_at_value = pobj.get("merged_at")
+        if merged_at_value:
+            out.value(pr, "mergedAt", merged_at_value)
+        out.link(repo, "hasPullRequest", pr)
+        if is_merged_pr(pobj):
+            out.add(pr, RDF_TYPE, iri("MergedPullRequest"))
+
+        user_login = pobj.get("user_login")
+        if user_login and user_login in user_map:
+            out.link(pr, "openedBy", user_map[user_login])
+
+        repo_id = pobj["repo_id"]
+        base_branch = branch_resolver.resolve(repo_id, (pobj.get("base_branch") or "").lower(), "base")
+        head_branch = branch_resolver.resolve(repo_id, (pobj.get("head_branch") or "").lower(), "head")
+        if base_branch:
+            out.link(pr, "hasBaseBranch", base_branch)
+        if head_branch:
+            out.link(pr, "hasHeadBranch", head_branch)
+        if merged_at_value and base_branch and head_branch:
+            out.link(head_branch, "mergedInto", base_branch)
+            merged.add(head_branch)
+    report("pulls")
+
+    # === Manual reasoning, from what was emitted above ===
+    for commit, ps in parents.items():
+        if len(ps) >= 2:
+            out.add(commit, RDF_TYPE, iri("MergeCommit"))
+        elif not ps:
+            out.add(commit, RDF_TYPE, iri("InitialCommit"))
+    for branch in set(branch_map.values()) - merged:
+        out.add(branch, RDF_TYPE, iri("UnmergedBranch"))
+    report("inference")
+
+
+def write_aggregates(out, aggregates):
+    """Emit the materialised counts of populate_graph.derive_aggregates()."""
+    for name, prop, count in aggregates.values():
+        out.value(iri(name), prop, count)
+
+
+def write_ntriples(path, report=None):
+    """Write schema + individuals to `path` atomically; returns the line count."""
+    report = report or StageReport()
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        out = NTriplesWriter(f)
+        write_schema(out)
+        report("schema")
+        write_individuals(out, report)
+        write_aggregates(out, derive_aggregates())
+        report("aggregates")
+        out.flush()
+    os.replace(tmp, path)
+    return out.count
+
+
+# --------------------------------------------------------
+# Sharded population (--jobs N)
+# --------------------------------------------------------
+def split_by_repo(data_dir, shard_root):
+    """Stream the data files (but users.json) into one NDJSON shard per repo.
+
+    Returns {repo_id: row count}, in order of first appearance.
+    """
+    sizes = {}
+    for filename in DATA_FILES:
+        if filename == "users.json":
+            continue
+        handles = {}
+        try:
+            for row in read_rows(data_dir, filename):
+                repo_id = row["repo_id"]
+                f = handles.get(repo_id)
+                if f is None:
+                    shard = Path(shard_root) / str(repo_id)
+                    shard.mkdir(exist_ok=True)
+                    f = handles[repo_id] = open(shard / filename, "w", encoding="utf-8")
+                f.write(json.dumps(row, ensure_ascii=False))
+                f.write("\n")
+                sizes[repo_id] = sizes.get(repo_id, 0) + 1
+        finally:
+            for f in handles.values():
+                f.close()
+    return sizes
+
+
+def write_fragment(shard_dir, path, logins):
+    """Worker: N-Triples fragment of one repo's shard; returns its line count."""
+    with open(path, "w", encoding="utf-8") as f:
+        out = NTriplesWriter(f)
+        write_individuals(out, StageReport(quiet=True), shard_dir, logins)
+        out.flush()
+    return out.count
+
+
+def write_ntriples_sharded(path, jobs, report=None):
+    """write_ntriples() with the per-repo work spread over `jobs` processes."""
+    report = report or StageReport()
+    tmp = f"{path}.tmp"
+    with tempfile.TemporaryDirectory(prefix="populate-", dir=os.path.dirname(os.path.abspath(path))) as work:
+        sizes = split_by_repo(DATA_DIR, work)
+        report("split")
+        with open(tmp, "w", encoding="utf-8") as f:
+            out = NTriplesWriter(f)
+            write_schema(out)
+            report("schema")
+            logins = set(write_users(out, report.rows(read_rows(DATA_DIR, "users.json"))))
+            report("users")
+
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                # The aggregates span repos, so they are derived from the
+                # whole dataset, by one more task (the longest, started first).
+                aggregates = pool.submit(derive_aggregates)
+                # Largest shards first, so a big repo does not start last.
+                futures = {repo_id: pool.submit(write_fragment, os.path.join(work, str(repo_id)),
+                                                os.path.join(work, f"{repo_id}.nt"), logins)
+                           for repo_id in sorted(sizes, key=sizes.get, reverse=True)}
+                for repo_id in sizes:
+                    out.append_file(os.path.join(work, f"{repo_id}.nt"), futures[repo_id].result())
+                write_aggregates(out, aggregates.result())
+                out.flush()
+            report(f"{len(sizes)} repos")
+            print(f"  workers peak RSS {peak_rss_mb(children=True):.0f} MB")
+        os.replace(tmp, path)
+    return out.count
@@ -0,0 +1,81 @@
+# --------------------------------------------------------
+# Write-ahead crawl journal for git_data.py
+# --------------------------------------------------------
+# Every unit of work (a repo's metadata, a branch listing, a commit) is
+# recorded in SQLite together with the output rows it produced. A unit and
+# its rows are committed in one transaction, so after a crash the journal
+# holds exactly the finished units; --resume skips them and data/*.json are
+# only (re)written from the journal once the whole crawl has finished.
+import json, os, sqlite3
+
+# Buffered rows are written out (still uncommitted as a unit) past this size,
+# so a unit producing many rows does not have to fit in memory.
+FLUSH_ROWS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    unit TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS rows (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    unit    TEXT NOT NULL,
+    kind    TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rows_by_kind ON rows (kind, id);
+"""
+
+
+class CrawlJournal:
+    """SQLite journal of finished work units and their output rows."""
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        if not resume and os.path.exists(path):
+            os.remove(path)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Rows of units that never finished belong to an interrupted run.
+        with self.conn:
+            self.conn.execute("DELETE FROM rows WHERE unit NOT IN (SELECT unit FROM units)")
+        self._done = {u for (u,) in self.conn.execute("SELECT unit FROM units")}
+        self._pending = []
+
+    def done(self, unit):
+        return unit in self._done
+
+    def finished(self, prefix):
+        """Names of finished units starting with `prefix`."""
+        return [u for u in self._done if u.startswith(prefix)]
+
+    def add(self, unit, kind, row):
+        """Buffer an output row; it only counts once its unit has finished."""
+        self._pending.append((unit, kind, json.dumps(row, ensure_ascii=False)))
+        if len(self._pending) >= FLUSH_ROWS:
+            self.finish()
+
+    def finish(self, *units):
+        """Atomically write buffered rows and mark `units` as finished."""
+        with self.conn:
+            self.conn.executemany("INSERT INTO rows (unit, kind, payload) VALUES (?, ?, ?)", self._pending)
+            self.conn.executemany("INSERT OR IGNORE INTO units (unit) VALUES (?)", [(u,) for u in units])
+        self._pending = []
+        self._done.update(units)
+
+    def count(self, kind):
+        return self.conn.execute("SELECT COUNT(*) FROM rows WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def rows(self, kind):
+        """All durable rows of one output kind, in the order they were produced."""
+        cur = self.conn.execute("SELECT payload FROM rows WHERE kind = ? ORDER BY id", (kind,))
+        for (payload,) in cur:
+            yield json.loads(payload)
+
+    def close(self, remove=False):
+        self.conn.close()
+        if remove:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
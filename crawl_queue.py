@@ -0,0 +1,313 @@
+# --------------------------------------------------------
+# Distributed crawl over a shared SQLite work queue
+# --------------------------------------------------------
+# Usage:
+#   python crawl_queue.py seed [OWNER/NAME ...]   # defaults to git_data.REPOS
+#   python crawl_queue.py work                    # run in as many processes / machines as you like
+#   python crawl_queue.py status
+#   python crawl_queue.py merge [--stream]        # write the standard data/*.json outputs
+#                                                 # (refused while tasks are unfinished or failed, unless --force)
+#
+# Tasks form a tree: a repo task emits the repo/issue/PR/branch rows and
+# queues one task per branch; a branch task reads the page count of the
+# branch's commit listing and queues one task per page; a commit_page task
+# fetches that page and the details of the commits on it. Workers claim
+# tasks under a time-limited lease, so a task held by a worker that died is
+# picked up again once its lease expires. A task's output rows, follow-up
+# tasks and completion are committed in one transaction.
+#
+# Workers on several machines must see the same queue file, e.g. on a
+# shared filesystem with working POSIX locks; SQLite serialises the
+# (short) queue transactions, while the HTTP work itself runs in parallel.
+import argparse, json, os, socket, sqlite3, sys, time
+
+from tqdm import tqdm
+
+import git_data as gd
+from data_io import write_json, write_ndjson
+
+QUEUE_FILE = os.getenv("GIT_DATA_QUEUE", "./data/crawl_queue.sqlite")
+LEASE_SECONDS = float(os.getenv("GIT_DATA_LEASE", "900"))
+MAX_ATTEMPTS = 5
+POLL_SECONDS = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind        TEXT NOT NULL,
+    payload     TEXT NOT NULL,
+    state       TEXT NOT NULL DEFAULT 'pending',   -- pending | leased | done | failed
+    owner       TEXT,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    UNIQUE (kind, payload)
+);
+CREATE INDEX IF NOT EXISTS tasks_by_state ON tasks (state, id);
+CREATE TABLE IF NOT EXISTS results (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id INTEGER NOT NULL,
+    kind    TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_by_kind ON results (kind, task_id, id);
+-- Cross-branch commit dedup shared by all workers (see git_data.main).
+CREATE TABLE IF NOT EXISTS seen_commits (
+    repo_id INTEGER NOT NULL,
+    sha     TEXT NOT NULL,
+    PRIMARY KEY (repo_id, sha)
+);
+"""
+
+
+class WorkQueue:
+    """Lease-based task queue stored in a SQLite file."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def put(self, kind, payload):
+        self.conn.execute("INSERT OR IGNORE INTO tasks (kind, payload) VALUES (?, ?)",
+                          (kind, json.dumps(payload, sort_keys=True)))
+
+    def claim(self, owner):
+        """Lease the oldest runnable task; returns (id, kind, payload) or None."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # A lease that expired MAX_ATTEMPTS times means the task keeps
+            # killing its worker; give up on it as fail() does for errors.
+            self.conn.execute(
+                "UPDATE tasks SET state = 'failed', lease_until = NULL, "
+                "error = COALESCE(error, 'lease expired') "
+                "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?", (now, MAX_ATTEMPTS))
+            row = self.conn.execute(
+                "SELECT id, kind, payload FROM tasks "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) "
+                "ORDER BY id LIMIT 1", (now,)).fetchone()
+            if row:
+                self.conn.execute(
+                    "UPDATE tasks SET state = 'leased', owner = ?, lease_until = ?, "
+                    "attempts = attempts + 1 WHERE id = ?", (owner, now + LEASE_SECONDS, row[0]))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def complete(self, task_id, owner, rows, new_tasks, new_commits=()):
+        """Commit a task's rows and follow-up tasks, if we still hold its lease.
+
+        `new_commits` are (repo_id, sha) pairs whose rows are only kept if no
+        other worker recorded the same commit first. Returns False when the
+        lease was lost (the task is then someone else's).
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            held = self.conn.execute(
+                "UPDATE tasks SET state = 'done', lease_until = NULL "
+                "WHERE id = ? AND owner = ? AND state = 'leased'", (task_id, owner)).rowcount
+            if not held:
+                self.conn.execute("ROLLBACK")
+                return False
+            won = set()
+            for key in new_commits:
+                if self.conn.execute("INSERT OR IGNORE INTO seen_commits (repo_id, sha) VALUES (?, ?)",
+                                     key).rowcount:
+                    won.add(key)
+            self.conn.executemany(
+                "INSERT INTO results (task_id, kind, payload) VALUES (?, ?, ?)",
+                [(task_id, kind, json.dumps(row, ensure_ascii=False))
+                 for kind, row, commit in rows if commit is None or commit in won])
+            for kind, payload in new_tasks:
+                self.put(kind, payload)
+            self.conn.execute("COMMIT")
+            return True
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def fail(self, task_id, owner, error):
+        """Release a task after an error; it is retried until MAX_ATTEMPTS."""
+        self.conn.execute(
+            "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = ?, lease_until = NULL WHERE id = ? AND owner = ?",
+            (MAX_ATTEMPTS, error, task_id, owner))
+
+    def known_commits(self, repo_id, shas):
+        marks = ",".join("?" * len(shas))
+        return {sha for (sha,) in self.conn.execute(
+            f"SELECT sha FROM seen_commits WHERE repo_id = ? AND sha IN ({marks})", (repo_id, *shas))}
+
+    def active(self):
+        """Number of tasks that are pending or leased (i.e. not finished)."""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def status(self):
+        return self.conn.execute(
+            "SELECT kind, state, COUNT(*) FROM tasks GROUP BY kind, state ORDER BY kind, state").fetchall()
+
+    def unfinished(self):
+        """{state: count} of the tasks that are not done (pending, leased or failed)."""
+        return dict(self.conn.execute(
+            "SELECT state, COUNT(*) FROM tasks WHERE state != 'done' GROUP BY state ORDER BY state"))
+
+    def count(self, kind):
+        return self.conn.execute("SELECT COUNT(*) FROM results WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def results(self, kind):
+        cur = self.conn.execute(
+            "SELECT payload FROM results WHERE kind = ? ORDER BY task_id, id", (kind,))
+        for (payload,) in cur:
+            yield json.loads(payload)
+
+
+# -----------------------------
+# Task handlers
+# -----------------------------
+# Each handler returns (rows, new_tasks, new_commits); rows are
+# (kind, row, commit_key) with commit_key None for rows that are always kept.
+def run_repo(task):
+    repo = gd.fetch_repo(task["repo"])
+    if not repo:
+        return [], [], []
+    repo_id = repo["id"]
+    default_branch = repo.get("default_branch", "main")
+    rows = [("repos", gd.repo_row(repo), None)]
+    gd.emit_issues_and_pulls(task["repo"], repo_id, lambda kind, row: rows.append((kind, row, None)))
+
+    tasks = []
+    for br in gd.fetch_branches(task["repo"]):
+        rows.append(("branches", {
+            "repo_id": repo_id,
+            "branch_name": br["name"],
+            "commit_sha": br["commit"]["sha"],
+            "is_default": br["name"] == default_branch
+        }, None))
+        tasks.append(("branch", {"repo": task["repo"], "repo_id": repo_id, "branch": br["name"]}))
+    return rows, tasks, []
+
+
+def commits_url(task):
+    return f"https://api.github.com/repos/{task['repo']}/commits?sha={task['branch']}&per_page=100"
+
+
+def run_branch(task):
+    first, headers = gd.fetch_json(f"{commits_url(task)}&page=1")
+    pages = gd.last_page(headers) or (1 if first else 0)
+    return [], [("commit_page", dict(task, page=p)) for p in range(1, pages + 1)], []
+
+
+def run_commit_page(task, queue):
+    commits, _ = gd.fetch_json(f"{commits_url(task)}&page={task['page']}")
+    commits = commits or []
+    repo_id, branch_name = task["repo_id"], task["branch"]
+    rows = [("commit_branches", {
+        "repo_id": repo_id,
+        "branch_name": branch_name,
+        "commit_sha": cm["sha"]
+    }, None) for cm in commits]
+
+    known = queue.known_commits(repo_id, [cm["sha"] for cm in commits]) if commits else set()
+    commits = [cm for cm in commits if cm["sha"] not in known]
+    details = gd.fetch_commit_details(task["repo"], [cm["sha"] for cm in commits])
+    for cm, cm_detail in zip(commits, details):
+        key = (repo_id, cm["sha"])
+        rows.extend((kind, row, key) for kind, row in gd.commit_rows(repo_id, branch_name, cm, cm_detail))
+    return rows, [], [(repo_id, cm["sha"]) for cm in commits]
+
+
+def work(queue, owner):
+    """Claim and run tasks until the queue is drained."""
+    done = 0
+    with tqdm(desc=f"Tasks ({owner})") as progress:
+        while True:
+            claimed = queue.claim(owner)
+            if not claimed:
+                if not queue.active():
+                    break
+                time.sleep(POLL_SECONDS)  # others still hold leases; they may queue more work
+                continue
+            task_id, kind, task = claimed
+            try:
+                if kind == "repo":
+                    result = run_repo(task)
+                elif kind == "branch":
+                    result = run_branch(task)
+                else:
+                    result = run_commit_page(task, queue)
+            except Exception as e:
+                queue.fail(task_id, owner, f"{e.__class__.__name__}: {e}")
+                tqdm.write(f"⚠️ {kind} {task}: {e}")
+                continue
+            if queue.complete(task_id, owner, *result):
+                done += 1
+                progress.update()
+    print(f"{owner}: {done} tasks, {gd.STATS.summary()}, {gd.CACHE.summary()}, {gd.SCHEDULER.summary()}")
+
+
+def merge(queue, stream=False, force=False):
+    """Write every kind of result row to the standard data/ outputs.
+
+    Refuses (returning False) while any task is pending, leased or failed,
+    since the outputs would silently miss that task's rows; `force` merges
+    anyway. Kinds without rows are skipped rather than written empty, so an
+    existing file of that kind is left alone.
+    """
+    unfinished = queue.unfinished()
+    if unfinished:
+        summary = ", ".join(f"{count} {state}" for state, count in unfinished.items())
+        if not force:
+            print(f"⚠️ Not merging: {summary} task(s) (see `status`; --force merges anyway)")
+            return False
+        print(f"⚠️ Merging a partial crawl: {summary} task(s)")
+    os.makedirs("data", exist_ok=True)
+    for kind, fname in gd.OUTPUT_FILES.items():
+        if not queue.count(kind):
+            continue
+        rows = queue.results(kind)
+        if kind == "users":
+            # Several tasks can discover the same (login, repo) pair.
+            rows = _unique(rows, gd.ROW_KEYS["users"])
+        count = write_ndjson(fname, rows) if stream else write_json(fname, rows)
+        print(f"{fname}: {count} records")
+    return True
+
+
+def _unique(rows, key):
+    seen = set()
+    for row in rows:
+        k = key(row)
+        if k not in seen:
+            seen.add(k)
+            yield row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed GitHub crawl over a shared work queue")
+    parser.add_argument("command", choices=["seed", "work", "status", "merge"])
+    parser.add_argument("repos", nargs="*", help="repositories to seed (default: git_data.REPOS)")
+    parser.add_argument("--queue", default=QUEUE_FILE, help="path of the shared queue database")
+    parser.add_argument("--owner", default=f"{socket.gethostname()}:{os.getpid()}",
+                        help="worker name recorded on leased tasks")
+    parser.add_argument("--stream", action="store_true", help="merge: write NDJSON instead of JSON arrays")
+    parser.add_argument("--force", action="store_true",
+                        help="merge even though some tasks are unfinished or failed")
+    args = parser.parse_args()
+
+    queue = WorkQueue(args.queue)
+    if args.command == "seed":
+        for name in args.repos or gd.REPOS:
+            queue.put("repo", {"repo": name})
+        print(f"Queued {len(args.repos or gd.REPOS)} repositories")
+    elif args.command == "work":
+        work(queue, args.owner)
+    elif args.command == "status":
+        for kind, state, count in queue.status():
+            print(f"{kind:12s} {state:8s} {count}")
+    else:
+        sys.exit(0 if merge(queue, stream=args.stream, force=args.force) else 1)
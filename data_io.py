@@ -0,0 +1,105 @@
+# --------------------------------------------------------
+# Record I/O shared by git_data.py and populate_graph.py
+# --------------------------------------------------------
+# data/*.json files are either a JSON array (the classic format, written with
+# indent=2) or NDJSON: one compact JSON object per line, as produced by the
+# crawler's --stream mode. Readers accept both; writers replace files
+# atomically, so a reader never sees a half-written file.
+import json, os, resource
+
+# JSON arrays are parsed from chunks of this many characters.
+READ_CHUNK = 1 << 16
+
+_decoder = json.JSONDecoder()
+_SEPARATORS = frozenset(" \t\r\n,")
+_DELIMITERS = _SEPARATORS | {"]"}
+
+
+def iter_records(path):
+    """Yield the rows of a data file lazily, whatever its format.
+
+    JSON arrays are parsed incrementally, one element at a time, so memory
+    does not grow with the file size. NDJSON is read one line at a time. A
+    torn last line (left by a crash mid-write) is ignored; any other
+    malformed line raises.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        if not head:
+            return
+        if head == "[":
+            yield from _iter_array(f)
+            return
+
+        f.seek(0)
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                if line.endswith("\n"):
+                    raise
+                print(f"⚠️ {path}: ignoring truncated last record")
+
+
+def write_json(path, rows):
+    """Atomically write rows as an indented JSON array. Returns the row count."""
+    rows = list(rows)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(rows, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+    return len(rows)
+
+
+def write_ndjson(path, rows):
+    """Atomically write rows as NDJSON, streaming them. Returns the row count."""
+    count = 0
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+            count += 1
+    os.replace(tmp, path)
+    return count
+
+
+def _iter_array(f):
+    """Yield the elements of a JSON array whose opening "[" was just read."""
+    buf, pos, eof = "", 0, False
+    while True:
+        # Skip whitespace and the separator before the next element.
+        while True:
+            while pos < len(buf) and buf[pos] in _SEPARATORS:
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(READ_CHUNK), 0
+            eof = not buf
+        if pos >= len(buf):
+            raise ValueError(f"{f.name}: unterminated JSON array")
+        if buf[pos] == "]":
+            return
+        try:
+            row, end = _decoder.raw_decode(buf, pos)
+        except ValueError:
+            end = len(buf)
+        # Only a delimiter after an element proves it complete (a number may go on).
+        if end >= len(buf) or buf[end] not in _DELIMITERS:
+            if eof:
+                raise ValueError(f"{f.name}: malformed JSON array element")
+            more = f.read(READ_CHUNK)
+            buf, pos, eof = buf[pos:] + more, 0, not more
+            continue
+        yield row
+        pos = end
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size of this process (or its largest finished child) so far, in MB."""
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return resource.getrusage(who).ru_maxrss / 1024
@@ -1,12 +1,31 @@
 #Written by Henri Scaffidi, with modifications by Tim.
 #Requires: pip install requests.
 
-import requests, json, os
+import requests, json, os, re, time, threading, hashlib, argparse, random, zlib
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 from tqdm import tqdm
+from data_io import iter_records, write_json, write_ndjson
+from crawl_journal import CrawlJournal
+import git_local
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")  # Add token to environment
 HEADERS = {"Authorization": f"token {GITHUB_TOKEN}"} if GITHUB_TOKEN else {}
 
+# Number of requests kept in flight against api.github.com.
+MAX_WORKERS = int(os.getenv("GIT_DATA_WORKERS", "8"))
+
+# On-disk response cache; set GIT_DATA_CACHE="" to disable it.
+CACHE_DIR = os.getenv("GIT_DATA_CACHE", "./.cache/http")
+
+# Request scheduler: ceiling on the request rate (token bucket; below it the
+# rate follows the remaining quota), burst size and how often a throttled or
+# failed request is retried before giving up.
+RATE_LIMIT = float(os.getenv("GIT_DATA_RATE", "20"))
+RATE_BURST = int(os.getenv("GIT_DATA_BURST", str(MAX_WORKERS)))
+MAX_RETRIES = int(os.getenv("GIT_DATA_RETRIES", "6"))
+
 #modify this to be a set of related repositories.
 REPOS = [
     "codersforcauses/guild-volunteering",
@@ -18,56 +37,519 @@ OUTPUT_FILES = {
     "branches": "./data/branches.json",
     "commits": "./data/commits.json",
     "users": "./data/users.json",
-    "files": "./data/files.json"
+    "files": "./data/files.json",
+    "commit_branches": "./data/commit_branches.json",
+    "issues": "./data/issues.json",
+    "pulls": "./data/pulls.json"
+}
+
+# Per-(repo, branch) watermarks used by --sync.
+SYNC_STATE_FILE = "./data/sync_state.json"
+
+# Write-ahead journal of finished work units, used by --resume.
+JOURNAL_FILE = "./data/crawl_journal.sqlite"
+COMMITS_PER_TRANSACTION = 200
+
+# Natural key of each output row, used to merge a sync into existing outputs.
+ROW_KEYS = {
+    "repos": lambda r: r["repo_id"],
+    "branches": lambda r: (r["repo_id"], r["branch_name"]),
+    "commits": lambda r: (r["repo_id"], r["commit_sha"]),
+    "users": lambda r: (r["user_login"], r["repo_id"]),
+    "files": lambda r: (r["repo_id"], r["commit_sha"], r["file_name"]),
+    "commit_branches": lambda r: (r["repo_id"], r["branch_name"], r["commit_sha"]),
+    "issues": lambda r: (r["repo_id"], r["issue_id"]),
+    "pulls": lambda r: (r["repo_id"], r["pr_id"]),
 }
 
+# -----------------------------
+# HTTP session & throughput stats
+# -----------------------------
+# One pooled session shared by every worker thread, so connections to the
+# API host are kept alive instead of being re-opened for each request.
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+
+class RequestStats:
+    """Thread-safe request counter, used to report requests per second."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.requests = 0
+
+    def record(self):
+        with self._lock:
+            self.requests += 1
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.requests / elapsed if elapsed > 0 else 0.0
+        return f"{self.requests} requests in {elapsed:.1f}s ({rate:.1f} req/s, {MAX_WORKERS} workers)"
+
+STATS = RequestStats()
+_executor = None
+
+# -----------------------------
+# On-disk response cache
+# -----------------------------
+# Commit details are addressed by SHA, so their content can never change.
+IMMUTABLE_URL = re.compile(r"/repos/[^/]+/[^/]+/commits/[0-9a-f]{40}$")
+CACHED_HEADERS = ("ETag", "Last-Modified", "Link")
+
+class ResponseCache:
+    """URL-keyed store of JSON bodies plus the validators needed to revalidate them."""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self.hits = 0          # served from disk without any request
+        self.revalidated = 0   # 304 Not Modified, body served from disk
+
+    def _path(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, url):
+        if not self.root:
+            return None
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url, body, headers):
+        if not self.root:
+            return
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "url": url,
+            "body": body,
+            "headers": {h: headers[h] for h in CACHED_HEADERS if h in headers},
+        }
+        # Write-then-rename so concurrent workers never see a partial entry;
+        # the temp name is unique per process and thread, as crawl_queue.py
+        # workers in several processes share one cache directory.
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def summary(self):
+        return f"cache: {self.hits} hits, {self.revalidated} not modified"
+
+CACHE = ResponseCache(CACHE_DIR)
+
+def get_executor():
+    """Lazily create the worker pool shared by all concurrent fetches."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    return _executor
+
+# -----------------------------
+# Rate-limit aware request scheduler
+# -----------------------------
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE, BACKOFF_CAP = 1.0, 60.0
+
+class RequestScheduler:
+    """Throttles requests with a token bucket and retries throttled/failed ones.
+
+    The bucket refills at remaining / (reset - now) requests per second, from
+    the X-RateLimit-Remaining/X-RateLimit-Reset headers of the latest
+    response, capped at `rate`, so the quota is spread over its window
+    instead of being spent in a burst. Should it still run out, every worker
+    pauses until the reset. Retry-After is honoured, and other failures back
+    off exponentially with full jitter.
+    """
+
+    def __init__(self, session, rate, burst, max_retries):
+        self.session = session
+        self.ceiling = rate
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self.retries = 0
+        self.waited = 0.0   # wall-clock seconds in which some request was held back
+        self._sleeping = 0
+        self._sleep_start = 0.0
+
+    def _sleep(self, seconds):
+        with self._lock:
+            if not self._sleeping:
+                self._sleep_start = time.monotonic()
+            self._sleeping += 1
+        try:
+            time.sleep(seconds)
+        finally:
+            with self._lock:
+                self._sleeping -= 1
+                if not self._sleeping:
+                    self.waited += time.monotonic() - self._sleep_start
+
+    def _acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._paused_until > now:
+                    delay = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+
+    def _pace(self, r):
+        """Spread the remaining quota evenly over the time left until its reset."""
+        remaining = r.headers.get("X-RateLimit-Remaining")
+        reset = r.headers.get("X-RateLimit-Reset")
+        if not remaining or not reset or int(remaining) == 0:
+            return
+        window = max(float(reset) - time.time(), 1.0)
+        with self._lock:
+            self.rate = min(self.ceiling, int(remaining) / window)
+
+    def _quota_reset_delay(self, r):
+        """Seconds until the quota resets, or None if it is not exhausted."""
+        if r.headers.get("X-RateLimit-Remaining") != "0":
+            return None
+        reset = r.headers.get("X-RateLimit-Reset")
+        return max(float(reset) - time.time(), 0) + 1 if reset else None
+
+    def is_retryable(self, r):
+        if r.status_code in RETRY_STATUSES:
+            return True
+        # 403 is also how GitHub reports primary and secondary rate limits.
+        return r.status_code == 403 and (
+            "Retry-After" in r.headers or self._quota_reset_delay(r) is not None
+        )
+
+    def _retry_delay(self, r, attempt):
+        if r is not None:
+            if "Retry-After" in r.headers:
+                return float(r.headers["Retry-After"])
+            reset_delay = self._quota_reset_delay(r)
+            if reset_delay is not None:
+                return reset_delay
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+    def get(self, url, headers=None):
+        for attempt in range(self.max_retries + 1):
+            self._acquire()
+            try:
+                r = self.session.get(url, headers=headers, timeout=30)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                r = None
+            STATS.record()
+            if r is not None:
+                self._pace(r)
+                reset_delay = self._quota_reset_delay(r)
+                if reset_delay is not None:
+                    with self._lock:
+                        self._paused_until = max(self._paused_until, time.monotonic() + reset_delay)
+                if not self.is_retryable(r) or attempt == self.max_retries:
+                    return r
+            with self._lock:
+                self.retries += 1
+            self._sleep(self._retry_delay(r, attempt))
+
+    def summary(self):
+        return f"{self.retries} retries, {self.waited:.1f}s throttled, pacing {self.rate:.1f} req/s"
+
+SCHEDULER = RequestScheduler(SESSION, RATE_LIMIT, RATE_BURST, MAX_RETRIES)
+
 # -----------------------------
 # Fetch helpers
 # -----------------------------
 def fetch_json(url):
-    r = requests.get(url, headers=HEADERS)
+    entry = CACHE.get(url)
+    if entry and IMMUTABLE_URL.search(url):
+        CACHE.count("hits")
+        return entry["body"], CaseInsensitiveDict(entry["headers"])
+
+    conditional = {}
+    if entry:
+        if "ETag" in entry["headers"]:
+            conditional["If-None-Match"] = entry["headers"]["ETag"]
+        if "Last-Modified" in entry["headers"]:
+            conditional["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+    r = SCHEDULER.get(url, headers=conditional)
+    if r.status_code == 304 and entry:
+        CACHE.count("revalidated")
+        return entry["body"], CaseInsensitiveDict(entry["headers"])
     if r.status_code == 200:
-        return r.json(), r.headers
+        data = r.json()
+        CACHE.put(url, data, r.headers)
+        return data, r.headers
+    if SCHEDULER.is_retryable(r):
+        # Out of retries: fail loudly rather than leave a silent gap in the data.
+        r.raise_for_status()
     return None, {}
 
+LAST_PAGE = re.compile(r'<([^>]*)>;\s*rel="last"')
+PAGE_PARAM = re.compile(r"[?&]page=(\d+)")
+
+def last_page(headers):
+    """Number of the last page advertised by a Link header, or None."""
+    m = LAST_PAGE.search(headers.get("Link", ""))
+    if m:
+        page = PAGE_PARAM.search(m.group(1))
+        if page:
+            return int(page.group(1))
+    return None
+
+def fetch_paginated(url, per_page=100):
+    """Fetch every page of a list endpoint, in order.
+
+    Page 1 is fetched first; its Link rel="last" tells how many pages there
+    are, and the rest are then fetched concurrently on the shared pool.
+    """
+    base = f"{url}{'&' if '?' in url else '?'}per_page={per_page}"
+    first, headers = fetch_json(f"{base}&page=1")
+    if not first:
+        return []
+    rows = list(first)
+    last = last_page(headers)
+    if last and last > 1:
+        pages = get_executor().map(lambda p: fetch_json(f"{base}&page={p}")[0], range(2, last + 1))
+        for page in pages:
+            rows.extend(page or [])
+    return rows
+
 def fetch_repo(full_name):
     data, _ = fetch_json(f"https://api.github.com/repos/{full_name}")
     return data
 
 def fetch_branches(full_name):
-    data, _ = fetch_json(f"https://api.github.com/repos/{full_name}/branches")
-    return data or []
+    return fetch_paginated(f"https://api.github.com/repos/{full_name}/branches")
+
+def fetch_issues(full_name):
+    """All issues of a repo; the issues endpoint also lists PRs, which are skipped."""
+    issues = fetch_paginated(f"https://api.github.com/repos/{full_name}/issues?state=all")
+    return [i for i in issues if "pull_request" not in i]
+
+def fetch_pulls(full_name):
+    return fetch_paginated(f"https://api.github.com/repos/{full_name}/pulls?state=all")
 
 def fetch_commit_detail(full_name, sha):
     data, _ = fetch_json(f"https://api.github.com/repos/{full_name}/commits/{sha}")
     return data or {}
 
+def fetch_commit_details(full_name, shas):
+    """Fetch commit details concurrently; results keep the order of `shas`."""
+    return list(get_executor().map(lambda sha: fetch_commit_detail(full_name, sha), shas))
+
 def count_commits(full_name, branch):
     """Estimate commit count using Link header on per_page=1"""
     url = f"https://api.github.com/repos/{full_name}/commits?sha={branch}&per_page=1"
     _, headers = fetch_json(url)
-    if "Link" in headers:
-        # Example: <https://api.github.com/...&page=500>; rel="last"
-        links = headers["Link"].split(",")
-        for link in links:
-            if 'rel="last"' in link:
-                last_url = link.split(";")[0].strip("<> ")
-                last_page = int(last_url.split("page=")[-1])
-                return last_page
-    return None  # fallback if missing
+    # Example: <https://api.github.com/...&page=500>; rel="last"
+    return last_page(headers)  # None if missing
 
 def fetch_all_commits(full_name, branch):
-    """Fetch all commits for a branch, 100 per page"""
-    all_commits = []
-    page = 1
-    while True:
-        url = f"https://api.github.com/repos/{full_name}/commits?sha={branch}&per_page=100&page={page}"
-        commits, _ = fetch_json(url)
-        if not commits:
-            break
-        all_commits.extend(commits)
-        page += 1
-    return all_commits
+    """Fetch all commits for a branch, 100 per page (pages fetched concurrently)."""
+    return fetch_paginated(f"https://api.github.com/repos/{full_name}/commits?sha={branch}")
+
+def fetch_new_commits(full_name, base_sha, head_sha, per_page=100):
+    """Commits reachable from `head_sha` but not from `base_sha`, newest first.
+
+    The compare endpoint follows ancestry, not dates, so commits that a
+    merge brings in are found however old their committer dates are.
+    Returns None when `base_sha` is not an ancestor of `head_sha` (e.g. the
+    branch was force-pushed); the branch must then be listed in full.
+    """
+    url = f"https://api.github.com/repos/{full_name}/compare/{base_sha}...{head_sha}?per_page={per_page}"
+    first, headers = fetch_json(f"{url}&page=1")
+    if not first or first.get("status") != "ahead":
+        return None
+    commits = list(first.get("commits", []))
+    last = last_page(headers)
+    if last and last > 1:
+        pages = get_executor().map(lambda p: fetch_json(f"{url}&page={p}")[0], range(2, last + 1))
+        for page in pages:
+            commits.extend((page or {}).get("commits", []))
+    commits.reverse()  # compare lists oldest first
+    return commits
+
+# -----------------------------
+# Issues & pull requests
+# -----------------------------
+def emit_issues_and_pulls(full_name, repo_id, emit):
+    for i in fetch_issues(full_name):
+        emit("issues", {
+            "repo_id": repo_id,
+            "issue_id": i["id"],
+            "issue_number": i["number"],
+            "title": i.get("title", ""),
+            "state": i.get("state", ""),
+            "created_at": i.get("created_at"),
+            "closed_at": i.get("closed_at"),
+            "user_login": (i.get("user") or {}).get("login", ""),
+            "comments": i.get("comments", 0)
+        })
+    for p in fetch_pulls(full_name):
+        emit("pulls", {
+            "repo_id": repo_id,
+            "pr_id": p["id"],
+            "number": p["number"],
+            "title": p.get("title", ""),
+            "state": p.get("state", ""),
+            "created_at": p.get("created_at"),
+            "merged_at": p.get("merged_at"),
+            "user_login": (p.get("user") or {}).get("login", ""),
+            "base_branch": p["base"]["ref"],
+            "head_branch": p["head"]["ref"]
+        })
+
+# -----------------------------
+# Incremental sync helpers
+# -----------------------------
+def load_json(fname, default):
+    if not os.path.exists(fname):
+        return default
+    with open(fname, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def load_rows(fname):
+    """Rows of an existing output file (JSON array or NDJSON), lazily."""
+    return iter_records(fname) if os.path.exists(fname) else iter(())
+
+def merge_rows(existing, fresh, key, replace=()):
+    """Merge freshly fetched rows into existing ones by natural key.
+
+    Rows of repos listed in `replace` are dropped from `existing` first, so a
+    full listing (e.g. branches) also removes entries that no longer exist.
+    """
+    kept = [r for r in existing if r["repo_id"] not in replace]
+    index = {key(r): i for i, r in enumerate(kept)}
+    for row in fresh:
+        k = key(row)
+        if k in index:
+            kept[index[k]] = row
+        else:
+            index[k] = len(kept)
+            kept.append(row)
+    return kept
+
+# -----------------------------
+# Local clone backend
+# -----------------------------
+def repo_row(repo):
+    return {
+        "repo_id": repo["id"],
+        "repo_name": repo["full_name"],
+        "repo_description": repo.get("description", ""),
+        "repo_language": repo.get("language", ""),
+        "repo_stars": repo.get("stargazers_count", 0),
+        "repo_forks": repo.get("forks_count", 0),
+        "repo_url": repo["html_url"]
+    }
+
+def local_repo_meta(full_name):
+    """API metadata for a cloned repo; synthesised (stable id) when unreachable."""
+    try:
+        repo = fetch_repo(full_name)
+    except requests.RequestException:
+        repo = None
+    return repo or {
+        "id": zlib.crc32(full_name.encode("utf-8")),
+        "full_name": full_name,
+        "html_url": f"https://github.com/{full_name}",
+    }
+
+def crawl_local(full_name, path, emit, seen_users, seen_commits):
+    """Emit the rows of one locally cloned repository; returns its repo_id.
+
+    Branch membership comes from one `git rev-list` per branch, and commits,
+    parents and file stats from a single streamed `git log` over all branches.
+    Rows use the same schema as the API crawl.
+    """
+    repo = local_repo_meta(full_name)
+    repo_id = repo["id"]
+    default_branch = repo.get("default_branch") or git_local.default_branch(path)
+    emit("repos", repo_row(repo))
+    if "default_branch" in repo:
+        # The API is reachable: issues and PRs only exist there.
+        emit_issues_and_pulls(full_name, repo_id, emit)
+
+    branches = git_local.list_branches(path)
+    first_branch = {}
+    for branch_name, head_sha in branches:
+        emit("branches", {
+            "repo_id": repo_id,
+            "branch_name": branch_name,
+            "commit_sha": head_sha,
+            "is_default": branch_name == default_branch
+        })
+        for sha in git_local.iter_branch_shas(path, branch_name):
+            emit("commit_branches", {
+                "repo_id": repo_id,
+                "branch_name": branch_name,
+                "commit_sha": sha
+            })
+            first_branch.setdefault(sha, branch_name)
+
+    refs = [f"refs/heads/{name}" for name, _ in branches]
+    for cm in tqdm(git_local.iter_commits(path, refs), total=len(first_branch),
+                   desc=f"Commits in {full_name}", leave=False):
+        sha = cm["sha"]
+        if (repo_id, sha) in seen_commits:
+            continue
+        seen_commits.add((repo_id, sha))
+        author_login = cm["author"][0]
+        committer_login = cm["committer"][0]
+        emit("commits", {
+            "repo_id": repo_id,
+            "branch_name": first_branch[sha],
+            "commit_sha": sha,
+            "commit_message": cm["message"],
+            "commit_date": cm["date"],
+            "commit_author_login": author_login,
+            "commit_committer_login": committer_login,
+            "commit_parent_count": len(cm["parents"]),
+            "commit_parents": cm["parents"],
+            "is_initial": not cm["parents"]
+        })
+
+        for f in cm["files"]:
+            emit("files", {
+                "repo_id": repo_id,
+                "commit_sha": sha,
+                "file_name": f["filename"],
+                "file_status": f["status"],
+                "file_additions": f["additions"],
+                "file_deletions": f["deletions"],
+                "file_changes": f["changes"]
+            })
+
+        for login, user_id, url in (cm["author"], cm["committer"]):
+            if login and (login, repo_id) not in seen_users:
+                emit("users", {
+                    "user_login": login,
+                    "repo_id": repo_id,
+                    "user_id": user_id,
+                    "user_url": url
+                })
+                seen_users.add((login, repo_id))
+    return repo_id
 
 # -----------------------------
 # Main
@@ -180,98 +662,196 @@ def fetch_all_commits(full_name, branch):
 
 from tqdm import tqdm
 
-def main():
-    repos_out, branches_out, commits_out, users_out, files_out = [], [], [], [], []
-    seen_users = set()
+def commit_rows(repo_id, branch_name, cm, cm_detail):
+    """(kind, row) pairs for one listed commit and its detail."""
+    sha = cm["sha"]
+    commit_info = cm["commit"]
+    author = cm.get("author") or {}
+    committer = cm.get("committer") or {}
+    cm_detail = cm_detail or {}
+    parents = [p["sha"] for p in cm_detail.get("parents", [])]
+    files = cm_detail.get("files", [])
+    is_initial = len(parents) == 0
+
+    rows = [("commits", {
+        "repo_id": repo_id,
+        "branch_name": branch_name,
+        "commit_sha": sha,
+        "commit_message": commit_info["message"],
+        "commit_date": commit_info["author"]["date"],
+        "commit_author_login": author.get("login", ""),
+        "commit_committer_login": committer.get("login", ""),
+        "commit_parent_count": len(parents),
+        "commit_parents": parents,
+        "is_initial": is_initial
+    })]
+
+    for f in files:
+        rows.append(("files", {
+            "repo_id": repo_id,
+            "commit_sha": sha,
+            "file_name": f["filename"],
+            "file_status": f.get("status", ""),
+            "file_additions": f.get("additions", 0),
+            "file_deletions": f.get("deletions", 0),
+            "file_changes": f.get("changes", 0)
+        }))
+
+    for u in (author, committer):
+        if u and u.get("login"):
+            rows.append(("users", {
+                "user_login": u["login"],
+                "repo_id": repo_id,
+                "user_id": u.get("id", ""),
+                "user_url": u.get("html_url", "")
+            }))
+    return rows
 
-    for repo_name in tqdm(REPOS, desc="Processing repositories"):
+def main(sync=False, stream=False, local=None, resume=False):
+    if not os.path.exists("data"):
+        os.makedirs("data")
+
+    # Every row goes to the crawl journal first, under the unit of work that
+    # produced it; data/*.json are only written from the journal at the end.
+    journal = CrawlJournal(JOURNAL_FILE, resume=resume)
+    if resume:
+        print(f"Resuming: {len(journal.finished(''))} units already done")
+
+    synced_repos = set()
+    seen_users = {(r["user_login"], r["repo_id"]) for r in journal.rows("users")}
+    sync_state = load_json(SYNC_STATE_FILE, {}) if sync else {}
+
+    # (repo_id, sha) of every commit already emitted. A commit reachable from
+    # many branches gets one commits/files entry; each extra branch only adds
+    # a commit_branches row.
+    seen_commits = set()
+    for unit in journal.finished("commit:"):
+        _, repo_id, sha = unit.split(":")
+        seen_commits.add((int(repo_id), sha))
+    if sync:
+        seen_commits.update((r["repo_id"], r["commit_sha"]) for r in load_rows(OUTPUT_FILES["commits"]))
+
+    # --local replaces the API crawl with local clones: {full_name: path}
+    for full_name, path in (local or {}).items():
+        unit = f"local:{full_name}"
+        if journal.done(unit):
+            synced_repos.add(local_repo_meta(full_name)["id"])
+            continue
+        emit = lambda kind, row: journal.add(unit, kind, row)
+        synced_repos.add(crawl_local(full_name, path, emit, seen_users, seen_commits))
+        journal.finish(unit)
+
+    for repo_name in tqdm([] if local else REPOS, desc="Processing repositories"):
         repo = fetch_repo(repo_name)
         if not repo:
             continue
         repo_id = repo["id"]
         default_branch = repo.get("default_branch", "main")
+        synced_repos.add(repo_id)
 
-        repos_out.append({
-            "repo_id": repo_id,
-            "repo_name": repo["full_name"],
-            "repo_description": repo.get("description", ""),
-            "repo_language": repo.get("language", ""),
-            "repo_stars": repo.get("stargazers_count", 0),
-            "repo_forks": repo.get("forks_count", 0),
-            "repo_url": repo["html_url"]
-        })
+        repo_unit = f"repo:{repo_name}"
+        if not journal.done(repo_unit):
+            emit = lambda kind, row: journal.add(repo_unit, kind, row)
+            emit("repos", repo_row(repo))
+            emit_issues_and_pulls(repo_name, repo_id, emit)
+            journal.finish(repo_unit)
 
         branches = fetch_branches(repo_name)
         for br in tqdm(branches, desc=f"Branches in {repo_name}", leave=False):
             branch_name = br["name"]
             is_default = branch_name == default_branch
-            branches_out.append({
+            branch_unit = f"branch:{repo_name}:{branch_name}"
+            if journal.done(branch_unit):
+                continue
+            journal.add(branch_unit, "branches", {
                 "repo_id": repo_id,
                 "branch_name": branch_name,
                 "commit_sha": br["commit"]["sha"],
                 "is_default": is_default
             })
 
-            commits = fetch_all_commits(repo_name, branch_name)
-            for cm in tqdm(commits, desc=f"Commits in {branch_name}", leave=False):
-                sha = cm["sha"]
-                commit_info = cm["commit"]
-                author = cm.get("author") or {}
-                committer = cm.get("committer") or {}
-                cm_detail = fetch_commit_detail(repo_name, sha) or {}
-                parents = [p["sha"] for p in cm_detail.get("parents", [])]
-                files = cm_detail.get("files", [])
-                is_initial = len(parents) == 0
-
-                commits_out.append({
+            mark = sync_state.get(repo_name, {}).get(branch_name)
+            if mark and mark["head_sha"] == br["commit"]["sha"]:
+                journal.finish(branch_unit)
+                continue  # branch head unchanged since the last sync
+            commits = fetch_new_commits(repo_name, mark["head_sha"], br["commit"]["sha"]) if mark else None
+            if commits is None:
+                commits = fetch_all_commits(repo_name, branch_name)
+            if commits:
+                journal.add(branch_unit, "_watermarks", {
+                    "repo": repo_name,
+                    "branch": branch_name,
+                    "head_sha": br["commit"]["sha"],
+                })
+            for cm in commits:
+                journal.add(branch_unit, "commit_branches", {
                     "repo_id": repo_id,
                     "branch_name": branch_name,
-                    "commit_sha": sha,
-                    "commit_message": commit_info["message"],
-                    "commit_date": commit_info["author"]["date"],
-                    "commit_author_login": author.get("login", ""),
-                    "commit_committer_login": committer.get("login", ""),
-                    "commit_parent_count": len(parents),
-                    "commit_parents": parents,
-                    "is_initial": is_initial
+                    "commit_sha": cm["sha"]
                 })
-
-                for f in files:
-                    files_out.append({
-                        "repo_id": repo_id,
-                        "commit_sha": sha,
-                        "file_name": f["filename"],
-                        "file_status": f.get("status", ""),
-                        "file_additions": f.get("additions", 0),
-                        "file_deletions": f.get("deletions", 0),
-                        "file_changes": f.get("changes", 0)
-                    })
-
-                for u in (author, committer):
-                    if u and u.get("login"):
-                        key = (u["login"], repo_id)
-                        if key not in seen_users:
-                            users_out.append({
-                                "user_login": u["login"],
-                                "repo_id": repo_id,
-                                "user_id": u.get("id", ""),
-                                "user_url": u.get("html_url", "")
-                            })
+            commits = [cm for cm in commits if (repo_id, cm["sha"]) not in seen_commits]
+            seen_commits.update((repo_id, cm["sha"]) for cm in commits)
+
+            # Details are fetched and journaled one transaction's worth at a
+            # time: a crash loses at most the chunk in flight, and only one
+            # chunk of details is held in memory.
+            progress = tqdm(total=len(commits), desc=f"Commits in {branch_name}", leave=False)
+            for start in range(0, len(commits), COMMITS_PER_TRANSACTION):
+                chunk = commits[start:start + COMMITS_PER_TRANSACTION]
+                details = fetch_commit_details(repo_name, [cm["sha"] for cm in chunk])
+                finished = []
+                for cm, cm_detail in zip(chunk, details):
+                    commit_unit = f"commit:{repo_id}:{cm['sha']}"
+                    for kind, row in commit_rows(repo_id, branch_name, cm, cm_detail):
+                        if kind == "users":
+                            key = (row["user_login"], repo_id)
+                            if key in seen_users:
+                                continue
                             seen_users.add(key)
+                        journal.add(commit_unit, kind, row)
+                    finished.append(commit_unit)
+                journal.finish(*finished)
+                progress.update(len(chunk))
+            progress.close()
+            journal.finish(branch_unit)
 
-    # Save JSONs
+        tqdm.write(f"{repo_name}: {STATS.summary()}, {CACHE.summary()}, {SCHEDULER.summary()}")
+
+    # Save JSONs (each file is replaced atomically)
     def save_json(fname, rows):
-        if rows:
-            with open(fname, "w", encoding="utf-8") as f:
-                json.dump(rows, f, indent=2, ensure_ascii=False)
-            print(f"{fname}: {len(rows)} records")
-    if not os.path.exists("data"):
-        os.makedirs("data")
-    save_json(OUTPUT_FILES["repos"], repos_out)
-    save_json(OUTPUT_FILES["branches"], branches_out)
-    save_json(OUTPUT_FILES["commits"], commits_out)
-    save_json(OUTPUT_FILES["users"], users_out)
-    save_json(OUTPUT_FILES["files"], files_out)
+        count = write_ndjson(fname, rows) if stream else write_json(fname, rows)
+        print(f"{fname}: {count} records")
+
+    for kind, fname in OUTPUT_FILES.items():
+        if sync and (journal.count(kind) or os.path.exists(fname)):
+            replace = synced_repos if kind == "branches" else ()
+            save_json(fname, merge_rows(load_rows(fname), journal.rows(kind), ROW_KEYS[kind], replace))
+        elif journal.count(kind):
+            save_json(fname, journal.rows(kind))
+
+    # Watermarks only advance once the outputs are on disk, so a full crawl
+    # also seeds the state for the next --sync run.
+    for mark in journal.rows("_watermarks"):
+        sync_state.setdefault(mark["repo"], {})[mark["branch"]] = {
+            "head_sha": mark["head_sha"],
+        }
+    if sync_state:
+        with open(SYNC_STATE_FILE, "w", encoding="utf-8") as f:
+            json.dump(sync_state, f, indent=2)
+    journal.close(remove=True)
+    print(f"Fetched {STATS.summary()}, {CACHE.summary()}, {SCHEDULER.summary()}")
     
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Crawl GitHub repositories into data/*.json")
+    parser.add_argument("--sync", action="store_true",
+                        help="only fetch commits added since the last run and merge them into data/")
+    parser.add_argument("--stream", action="store_true",
+                        help="write data/ as NDJSON, streamed from the crawl journal")
+    parser.add_argument("--local", action="append", default=[], metavar="OWNER/NAME=PATH",
+                        help="read this repository from a local clone (e.g. git clone --mirror) "
+                             "instead of the API; may be repeated, and REPOS is then skipped")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted crawl, skipping the units recorded in the journal")
+    args = parser.parse_args()
+    local = dict(spec.split("=", 1) for spec in args.local)
+    main(sync=args.sync, stream=args.stream, local=local, resume=args.resume)
@@ -0,0 +1,171 @@
+# --------------------------------------------------------
+# Local clone backend for git_data.py
+# --------------------------------------------------------
+# Reads commits, parents, authors and per-file additions/deletions straight
+# from a local repository (ideally a `git clone --mirror`), streaming the
+# output of a single `git log` pass instead of one API request per commit.
+import re, subprocess
+from datetime import datetime, timezone
+
+RECORD, FIELD, END = "\x1e", "\x1f", "\x1d"
+LOG_FORMAT = RECORD + FIELD.join(["%H", "%P", "%an", "%ae", "%cn", "%ce", "%aI", "%B"]) + END
+
+# git --raw status letters → GitHub API file status names. Renames are
+# detected (-M) as the API does; copy detection is left off, so "C" never
+# occurs and a copy is reported as an added file, again as the API does.
+FILE_STATUS = {
+    "A": "added",
+    "M": "modified",
+    "D": "removed",
+    "T": "changed",
+    "R": "renamed",
+}
+
+NOREPLY_EMAIL = re.compile(r"^(?:(\d+)\+)?([^@]+)@users\.noreply\.github\.com$", re.I)
+
+
+def git(path, *args):
+    return subprocess.run(["git", "-C", path, *args], check=True,
+                          capture_output=True, text=True).stdout
+
+
+def list_branches(path):
+    """[(branch_name, head_sha)] for every local branch (refs/heads)."""
+    out = git(path, "for-each-ref", "--format=%(refname:short)%00%(objectname)", "refs/heads")
+    return [tuple(line.split("\0")) for line in out.splitlines() if line]
+
+
+def default_branch(path):
+    try:
+        return git(path, "symbolic-ref", "--short", "HEAD").strip()
+    except subprocess.CalledProcessError:
+        return "main"
+
+
+def iter_branch_shas(path, branch):
+    """Stream the SHAs reachable from a branch, newest first."""
+    proc = subprocess.Popen(["git", "-C", path, "rev-list", f"refs/heads/{branch}"],
+                            stdout=subprocess.PIPE, text=True)
+    try:
+        for line in proc.stdout:
+            yield line.strip()
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+
+def user_from(name, email):
+    """(login, user_id, url) for a commit identity.
+
+    GitHub noreply addresses carry the real login (and usually the numeric
+    id); any other identity falls back to the author name.
+    """
+    m = NOREPLY_EMAIL.match(email or "")
+    if m:
+        login = m.group(2)
+        return login, int(m.group(1)) if m.group(1) else "", f"https://github.com/{login}"
+    return name, "", ""
+
+
+def to_utc(iso_date):
+    """'2017-03-12T00:09:33+08:00' → '2017-03-11T16:09:33Z' (the API's format)."""
+    return datetime.fromisoformat(iso_date).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_header(text):
+    sha, parents, an, ae, cn, ce, date, message = text.split(FIELD, 7)
+    return {
+        "sha": sha,
+        "parents": parents.split(),
+        "author": user_from(an, ae),
+        "committer": user_from(cn, ce),
+        "date": to_utc(date),
+        "message": message.rstrip("\n"),
+        "files": {},
+    }
+
+
+def _tokens(stream, size=1 << 16):
+    """Split a `git log -z` stream into its NUL-terminated fields."""
+    rest = ""
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        fields = (rest + chunk).split("\0")
+        rest = fields.pop()
+        yield from fields
+    if rest:
+        yield rest
+
+
+def _entry(files, path, previous=None):
+    entry = files.setdefault(path, {"filename": path, "status": "modified",
+                                    "additions": 0, "deletions": 0})
+    if previous is not None:
+        entry["previous_filename"] = previous
+    return entry
+
+
+def _add_file_fields(commit, field, fields):
+    """Record one --raw or --numstat entry; paths are taken verbatim from `fields`."""
+    files = commit["files"]
+    if field.startswith(":"):
+        # :100644 100644 abc123 def456 M \0path  (R100 \0old\0new for renames)
+        status = field.split()[-1][0]
+        path = next(fields)
+        previous = None
+        if status == "R":
+            previous, path = path, next(fields)
+        _entry(files, path, previous)["status"] = FILE_STATUS.get(status, "modified")
+    else:
+        # adds\tdels\tpath  ("-" for binary files; an empty path is followed
+        # by \0old\0new for renames)
+        adds, dels, path = field.split("\t", 2)
+        if not path:
+            next(fields)
+            path = next(fields)
+        entry = _entry(files, path)
+        entry["additions"] = int(adds) if adds != "-" else 0
+        entry["deletions"] = int(dels) if dels != "-" else 0
+
+
+def iter_commits(path, refs):
+    """Stream every commit reachable from `refs` with its file changes.
+
+    Merge commits are diffed against their first parent and renames are
+    detected, as the GitHub API does. Each yielded dict has sha, parents,
+    author/committer (login, id, url), date (UTC), message and files
+    (GitHub-style dicts). Paths are read NUL-terminated (-z), so they are
+    never C-quoted and match the API's file names byte for byte.
+    """
+    cmd = ["git", "-C", path, "log", "-z", "--raw", "--numstat", "-M",
+           "--diff-merges=first-parent", f"--format={LOG_FORMAT}", *refs, "--"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True,
+                            encoding="utf-8", errors="replace")
+    commit = None
+    try:
+        fields = _tokens(proc.stdout)
+        for field in fields:
+            field = field.lstrip("\n")
+            if field.startswith(RECORD):
+                if commit:
+                    yield _finish(commit)
+                commit = _parse_header(field[1:].split(END, 1)[0])
+            elif commit and field:
+                _add_file_fields(commit, field, fields)
+        if commit:
+            yield _finish(commit)
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+def _finish(commit):
+    files = list(commit["files"].values())
+    for f in files:
+        f["changes"] = f.get("additions", 0) + f.get("deletions", 0)
+    commit["files"] = files
+    return commit
@@ -0,0 +1,334 @@
+# --------------------------------------------------------
+# Binary graph snapshots, memory-mapped and read through rdflib
+# --------------------------------------------------------
+# Usage:
+#   python graph_snapshot.py SOURCE [OUTPUT]   # any RDF file → .snap
+#   populate_graph.py --snapshot [PATH]         # written along with the ontology
+#
+# A snapshot holds the graph already dictionary-encoded:
+#   header     magic, id typecode, term count, triple count
+#   terms      offsets into a UTF-8 blob of the distinct terms; the terms
+#              are sorted, so an id is a term's rank and finding the id of
+#              a term is a binary search
+#   SPO/POS/OSP  the triples as id triples, sorted in three orders
+# SnapshotStore maps the file and answers each triple pattern with a
+# binary search in the order whose prefix the pattern binds. Nothing is
+# parsed or built at load time, and processes that map the same file share
+# its pages through the page cache.
+#
+# NumPy is not a dependency of this project: the arrays are read in place
+# as memoryview casts of the mapping, in native byte order.
+import mmap, os, re, struct, sys
+from functools import lru_cache
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.store import VALID_STORE, Store
+from rdflib.util import guess_format
+
+SNAPSHOT_SUFFIX = ".snap"
+MAGIC = b"GOLSNAP1"
+HEADER = struct.Struct("<8sc7xQQ")   # magic, id typecode, term count, triple count
+ORDERS = ("spo", "pos", "osp")
+# Rows are copied out of the mapping this many at a time while iterating.
+ROW_CHUNK = 4096
+# Decoded terms kept per store.
+TERM_CACHE = 1 << 16
+
+XSD_STRING = "http://www.w3.org/2001/XMLSchema#string"
+
+
+# -----------------------------
+# Term keys
+# -----------------------------
+# A term's key is its kind ("U", "B" or "L") and its value; a literal's
+# value is "datatype \0 language \0 lexical form".
+def term_key(term):
+    if isinstance(term, URIRef):
+        return ("U" + term).encode()
+    if isinstance(term, BNode):
+        return ("B" + term).encode()
+    if isinstance(term, Literal):
+        return f"L{term.datatype or ''}\0{term.language or ''}\0{term}".encode()
+    return None
+
+
+def key_term(key):
+    kind, value = key[:1], key[1:].decode()
+    if kind == b"U":
+        return URIRef(value)
+    if kind == b"B":
+        return BNode(value)
+    datatype, language, lexical = value.split("\0", 2)
+    return Literal(lexical, lang=language or None, datatype=URIRef(datatype) if datatype else None)
+
+
+_NT_TERM = re.compile(r'\s*(?:<([^>]*)>|_:(\S+)|"((?:[^"\\]|\\.)*)"(?:\^\^<([^>]*)>|@([A-Za-z0-9-]+))?)')
+_NT_ESCAPE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+_NT_CHARS = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
+
+def _unescape(text):
+    if "\\" not in text:
+        return text
+    return _NT_ESCAPE.sub(lambda m: chr(int(m.group(1) or m.group(2), 16)) if m.group(3) is None
+                          else _NT_CHARS[m.group(3)], text)
+
+
+def ntriples_keys(path):
+    """Yield the (s, p, o) term keys of an N-Triples file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            keys, pos = [], 0
+            for _ in range(3):
+                m = _NT_TERM.match(line, pos)
+                if not m:
+                    raise ValueError(f"{path}: malformed N-Triples line: {line[:80]}")
+                pos = m.end()
+                iri, bnode, lexical, datatype, language = m.groups()
+                if iri is not None:
+                    keys.append(("U" + _unescape(iri)).encode())
+                elif bnode is not None:
+                    keys.append(("B" + bnode).encode())
+                elif datatype and datatype != XSD_STRING:
+                    # Typed literals go through rdflib, which normalises the lexical form.
+                    keys.append(term_key(Literal(_unescape(lexical), datatype=URIRef(datatype))))
+                else:
+                    keys.append(f"L{datatype or ''}\0{language or ''}\0{_unescape(lexical)}".encode())
+            yield keys
+
+
+# -----------------------------
+# Writing
+# -----------------------------
+def write_snapshot(triples, path):
+    """Write (s, p, o) term key triples as a snapshot, atomically. Returns the triple count."""
+    ids = {}
+    packed = []
+    for s, p, o in triples:
+        packed.append((ids.setdefault(s, len(ids)), ids.setdefault(p, len(ids)), ids.setdefault(o, len(ids))))
+    terms = sorted(ids)
+    rank = [0] * len(terms)
+    for i, key in enumerate(terms):
+        rank[ids[key]] = i
+    del ids
+
+    # Each id triple is packed into one int per order, so sorting and
+    # deduplicating are plain int operations.
+    bits = max(len(terms), 1).bit_length()
+    mask = (1 << bits) - 1
+    spo = sorted({(rank[s] << 2 * bits) | (rank[p] << bits) | rank[o] for s, p, o in packed})
+    del packed
+    typecode = "I" if len(terms) < 1 << 32 else "Q"
+
+    def rows(order):
+        if order == "spo":
+            keys = spo
+        else:
+            keys = []
+            for k in spo:
+                s, p, o = k >> 2 * bits, (k >> bits) & mask, k & mask
+                keys.append((p << 2 * bits) | (o << bits) | s if order == "pos" else (o << 2 * bits) | (s << bits) | p)
+            keys.sort()
+        flat = memoryview(bytearray(len(keys) * 3 * struct.calcsize(typecode))).cast(typecode)
+        for i, k in enumerate(keys):
+            flat[3 * i], flat[3 * i + 1], flat[3 * i + 2] = k >> 2 * bits, (k >> bits) & mask, k & mask
+        return flat
+
+    offsets = memoryview(bytearray(8 * (len(terms) + 1))).cast("Q")
+    pos = 0
+    for i, key in enumerate(terms):
+        offsets[i] = pos
+        pos += len(key)
+    offsets[len(terms)] = pos
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, typecode.encode(), len(terms), len(spo)))
+        f.write(offsets)
+        for key in terms:
+            f.write(key)
+        f.write(b"\0" * (-pos % 8))
+        for order in ORDERS:
+            f.write(rows(order))
+    os.replace(tmp, path)
+    return len(spo)
+
+
+def snapshot_ntriples(source, path):
+    return write_snapshot(ntriples_keys(source), path)
+
+
+def snapshot_graph(graph, path):
+    return write_snapshot(((term_key(s), term_key(p), term_key(o)) for s, p, o in graph), path)
+
+
+def snapshot_ontology(onto, path):
+    """Snapshot of an owlready2 ontology, through its own N-Triples writer."""
+    tmp = f"{path}.nt"
+    onto.save(file=tmp, format="ntriples")
+    try:
+        return snapshot_ntriples(tmp, path)
+    finally:
+        os.remove(tmp)
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+class SnapshotStore(Store):
+    """Read-only rdflib Store over a memory-mapped snapshot file."""
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, configuration=None, identifier=None):
+        self._prefixes = {}    # prefix → namespace
+        self._namespaces = {}  # namespace → prefix
+        super().__init__(configuration, identifier)
+
+    def open(self, configuration, create=False):
+        with open(configuration, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, typecode, n_terms, n_triples = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{configuration}: not a graph snapshot")
+        view = memoryview(self._map)
+        pos = HEADER.size
+        self._offsets = view[pos:pos + 8 * (n_terms + 1)].cast("Q")
+        self._blob = pos + 8 * (n_terms + 1)
+        pos = self._blob + self._offsets[n_terms]
+        pos += -pos % 8
+        size = 3 * n_triples * struct.calcsize(typecode.decode())
+        self._rows = {}
+        for order in ORDERS:
+            self._rows[order] = view[pos:pos + size].cast(typecode.decode())
+            pos += size
+        self._n_terms, self._n_triples = n_terms, n_triples
+        self._term = lru_cache(maxsize=TERM_CACHE)(self._decode)
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction=False):
+        self._offsets.release()
+        for rows in self._rows.values():
+            rows.release()
+        self._map.close()
+
+    # === Term dictionary ===
+    def _key(self, i):
+        return self._map[self._blob + self._offsets[i]:self._blob + self._offsets[i + 1]]
+
+    def _decode(self, i):
+        return key_term(self._key(i))
+
+    def _id(self, term):
+        key = term_key(term)
+        if key is None:
+            return None
+        lo, hi = 0, self._n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self._n_terms and self._key(lo) == key else None
+
+    # === Triple patterns ===
+    def _bound(self, rows, prefix, upper):
+        k = len(prefix)
+        lo, hi = 0, self._n_triples
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = tuple(rows[3 * mid:3 * mid + k])
+            if row < prefix or (upper and row == prefix):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def triples(self, triple_pattern, context=None):
+        ids = []
+        for term in triple_pattern:
+            i = None if term is None else self._id(term)
+            if term is not None and i is None:
+                return  # a term the graph does not have
+            ids.append(i)
+        s, p, o = ids
+        if s is not None and o is not None and p is None:
+            order, prefix = "osp", (o, s)
+        elif s is not None:
+            order, prefix = "spo", tuple(i for i in (s, p, o) if i is not None)
+        elif p is not None:
+            order, prefix = "pos", (p,) if o is None else (p, o)
+        elif o is not None:
+            order, prefix = "osp", (o,)
+        else:
+            order, prefix = "spo", ()
+
+        rows = self._rows[order]
+        lo = self._bound(rows, prefix, False) if prefix else 0
+        hi = self._bound(rows, prefix, True) if prefix else self._n_triples
+        term = self._term
+        for start in range(lo, hi, ROW_CHUNK):
+            chunk = rows[3 * start:3 * min(start + ROW_CHUNK, hi)].tolist()
+            for j in range(0, len(chunk), 3):
+                a, b, c = chunk[j:j + 3]
+                if order == "spo":
+                    triple = (term(a), term(b), term(c))
+                elif order == "pos":
+                    triple = (term(c), term(a), term(b))
+                else:
+                    triple = (term(b), term(c), term(a))
+                yield triple, iter(())
+
+    def __len__(self, context=None):
+        return self._n_triples
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def add(self, triple, context, quoted=False):
+        raise TypeError("graph snapshots are read-only")
+
+    def remove(self, triple, context=None):
+        raise TypeError("graph snapshots are read-only")
+
+    # === Namespace bindings (kept in memory, like rdflib's Memory store) ===
+    def bind(self, prefix, namespace, override=True):
+        if not override and (prefix in self._prefixes or namespace in self._namespaces):
+            return
+        old = self._prefixes.pop(prefix, None)
+        if old is not None:
+            self._namespaces.pop(old, None)
+        self._namespaces.pop(namespace, None)
+        self._prefixes[prefix] = namespace
+        self._namespaces[namespace] = prefix
+
+    def namespace(self, prefix):
+        return self._prefixes.get(prefix)
+
+    def prefix(self, namespace):
+        return self._namespaces.get(namespace)
+
+    def namespaces(self):
+        yield from self._prefixes.items()
+
+
+def open_snapshot(path):
+    """rdflib Graph over the snapshot at `path`."""
+    return Graph(store=SnapshotStore(path))
+
+
+if __name__ == "__main__":
+    source = sys.argv[1]
+    output = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source)[0] + SNAPSHOT_SUFFIX
+    if guess_format(source) == "nt":
+        count = snapshot_ntriples(source, output)
+    else:
+        count = snapshot_graph(Graph().parse(source, format=guess_format(source) or "xml"), output)
+    print(f"✅ Snapshot written: {output} ({count} triples)")
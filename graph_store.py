@@ -0,0 +1,290 @@
+# --------------------------------------------------------
+# SPARQL graph store backends for the query tools and the web app
+# --------------------------------------------------------
+# GIT_ONTO_STORE picks the engine that answers SPARQL:
+#   memory     rdflib's in-memory Graph, parsed from GIT_ONTO_GRAPH
+#   cached     a snapshot of GIT_ONTO_GRAPH built on first use and kept next
+#              to it (<graph>.snap), rebuilt when the graph file's hash
+#              changes; later runs map it instead of parsing the graph
+#   snapshot   the GIT_ONTO_GRAPH .snap of populate_graph.py --snapshot, memory-mapped
+#   owlready2  owlready2's SQLite quadstore, through its rdflib view: the
+#              GIT_ONTO_DB store of populate_graph.py --db, or GIT_ONTO_GRAPH
+#              loaded into a fresh (in-memory) one
+#   oxigraph   pyoxigraph's embedded store (pip install pyoxigraph), kept at
+#              GIT_ONTO_OXIGRAPH with the graph's SHA-256 beside it in
+#              <store>.sha256; cleared and reloaded from GIT_ONTO_GRAPH
+#              whenever the graph file's hash changes
+# Without GIT_ONTO_STORE the backend follows the other settings: owlready2
+# when GIT_ONTO_DB is set, snapshot for a .snap GIT_ONTO_GRAPH, else cached.
+#
+# Every backend returns result rows as tuples of rdflib terms (None for an
+# unbound variable), so consumers print them the same way whatever answers.
+# A store's version is the SHA-256 of the file it answers from, which keys
+# the result cache of query_cache.py. It is revalidated (a stat, and a rehash
+# if that changed) on every use, and a store whose file changed reloads it.
+import hashlib, os, threading
+from abc import ABC, abstractmethod
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.util import guess_format
+
+from graph_snapshot import SNAPSHOT_SUFFIX, open_snapshot, snapshot_graph, snapshot_ntriples
+
+BACKENDS = ("memory", "cached", "snapshot", "owlready2", "oxigraph")
+DEFAULT_GRAPH = "ontology/git-onto-logic-populated.owl"
+DEFAULT_OXIGRAPH = "ontology/git-onto-logic.oxigraph"
+
+
+def graph_path():
+    return os.getenv("GIT_ONTO_GRAPH", DEFAULT_GRAPH)
+
+
+def default_backend():
+    backend = os.getenv("GIT_ONTO_STORE")
+    if backend:
+        return backend
+    if os.getenv("GIT_ONTO_DB"):
+        return "owlready2"
+    return "snapshot" if graph_path().endswith(SNAPSHOT_SUFFIX) else "cached"
+
+
+def load_graph(path):
+    """In-memory rdflib Graph of an RDF file or a snapshot."""
+    g = Graph()
+    if path.endswith(SNAPSHOT_SUFFIX):
+        g += open_snapshot(path)
+    else:
+        g.parse(path, format=guess_format(path) or "xml")
+    return g
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_stamp(stamp):
+    """The hash recorded in a stamp file, or None when there is none."""
+    try:
+        with open(stamp, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def write_stamp(stamp, digest):
+    with open(f"{stamp}.tmp", "w", encoding="utf-8") as f:
+        f.write(digest + "\n")
+    os.replace(f"{stamp}.tmp", stamp)
+
+
+def cached_snapshot(path):
+    """Path of an up-to-date snapshot of the graph file at `path`.
+
+    The snapshot lives at <path>.snap with the graph's SHA-256 beside it in
+    <path>.snap.sha256; it is (re)built, parsing the graph once, when either
+    is missing or the hash no longer matches.
+    """
+    snap = path + SNAPSHOT_SUFFIX
+    stamp = snap + ".sha256"
+    digest = file_hash(path)
+    if read_stamp(stamp) != digest or not os.path.exists(snap):
+        if guess_format(path) == "nt":
+            snapshot_ntriples(path, snap)
+        else:
+            snapshot_graph(load_graph(path), snap)
+        write_stamp(stamp, digest)
+    return snap
+
+
+def _rows(result):
+    if result.type == "ASK":
+        return [(Literal(result.askAnswer),)]
+    return [tuple(row) for row in result]
+
+
+class GraphStore(ABC):
+    """SPARQL over one backend; query() returns the result rows as a list."""
+
+    backend = None
+    source = None    # the file the graph was loaded from
+    _version = None
+    _stat = None     # (inode, size, mtime) of the source when last hashed
+
+    def __init__(self):
+        self._lock = threading.Lock()  # serialises revalidation and reload of this store
+
+    @property
+    def version(self):
+        """SHA-256 of the source file, as of the data the store answers from.
+
+        The source is stat()ed on every call and rehashed only when its
+        inode, size or mtime changed. A changed hash reloads the store;
+        stores that cannot reload keep the version of what they hold.
+        """
+        st = os.stat(self.source)
+        stat = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if stat != self._stat:
+                self._stat = stat
+                version = file_hash(self.source)
+                if version != self._version and (self._version is None or self.reload()):
+                    self._version = version
+            return self._version
+
+    def reload(self):
+        """Pick up a changed source file; False if this store cannot."""
+        return False
+
+    @abstractmethod
+    def query(self, sparql):
+        """Result rows of `sparql` as a list of tuples."""
+
+    @abstractmethod
+    def __len__(self):
+        """Number of triples in the graph."""
+
+
+class RdflibStore(GraphStore):
+    def __init__(self, graph, backend, source=None, loader=None):
+        super().__init__()
+        self.graph = graph
+        self.backend = backend
+        self.source = source
+        self.loader = loader  # rebuilds the graph from the source, for reload()
+
+    def reload(self):
+        if self.loader is None:
+            return False
+        self.graph = self.loader()
+        return True
+
+    def query(self, sparql):
+        return _rows(self.graph.query(sparql))
+
+    def __len__(self):
+        return len(self.graph)
+
+
+class OwlreadyStore(RdflibStore):
+    """owlready2 quadstore, queried through its rdflib view.
+
+    (owlready2's own SPARQL engine is faster but answers OPTIONAL chains
+    and aggregate subqueries, e.g. queries 7 and 11, differently.)
+    """
+
+    def __init__(self, world, source=None, live=False):
+        super().__init__(world.as_rdflib_graph(), "owlready2", source)
+        self.world = world
+        self.live = live  # source is the quadstore itself, read on every query
+
+    def reload(self):
+        return self.live
+
+
+class OxigraphStore(GraphStore):
+    backend = "oxigraph"
+
+    def __init__(self, path, source):
+        try:
+            import pyoxigraph
+        except ImportError:
+            raise ImportError("the oxigraph graph store needs pyoxigraph (pip install pyoxigraph)") from None
+        super().__init__()
+        self.ox = pyoxigraph
+        self.path = path
+        self.source = source
+        self.store = pyoxigraph.Store(path)
+        self._sync()
+
+    def reload(self):
+        self._sync()
+        return True
+
+    def _sync(self):
+        """Reload the store from the source unless <store>.sha256 shows it is current."""
+        stamp = f"{self.path}.sha256"
+        digest = file_hash(self.source)
+        if read_stamp(stamp) == digest and len(self.store):
+            return
+        if os.path.exists(stamp):
+            os.remove(stamp)  # a load interrupted below must not look current
+        self.store.clear()
+        self._load(self.source)
+        write_stamp(stamp, digest)
+
+    def _load(self, source):
+        if source.endswith(SNAPSHOT_SUFFIX):
+            self.store.extend(self.ox.Quad(*map(self._ox_term, t)) for t in open_snapshot(source))
+        else:
+            extension = source.rsplit(".", 1)[-1]
+            self.store.bulk_load(path=source, format=self.ox.RdfFormat.from_extension(
+                "rdf" if extension == "owl" else extension))
+        self.store.flush()
+
+    def _ox_term(self, term):
+        if isinstance(term, URIRef):
+            return self.ox.NamedNode(str(term))
+        if isinstance(term, BNode):
+            return self.ox.BlankNode(str(term))
+        if term.language:
+            return self.ox.Literal(str(term), language=term.language)
+        return self.ox.Literal(str(term), datatype=self.ox.NamedNode(str(term.datatype)) if term.datatype else None)
+
+    def _term(self, term):
+        if term is None:
+            return None
+        if isinstance(term, self.ox.NamedNode):
+            return URIRef(term.value)
+        if isinstance(term, self.ox.BlankNode):
+            return BNode(term.value)
+        if term.language:
+            return Literal(term.value, lang=term.language)
+        return Literal(term.value, datatype=URIRef(term.datatype.value))
+
+    def query(self, sparql):
+        result = self.store.query(sparql)
+        if isinstance(result, self.ox.QueryBoolean):
+            return [(Literal(bool(result)),)]
+        if isinstance(result, self.ox.QuerySolutions):
+            width = len(result.variables)
+            return [tuple(self._term(solution[i]) for i in range(width)) for solution in result]
+        return [(self._term(t.subject), self._term(t.predicate), self._term(t.object)) for t in result]
+
+    def __len__(self):
+        return len(self.store)
+
+
+def open_store(backend=None, world=None, path=None):
+    """GraphStore for `backend` (default: from the environment, see above).
+
+    `path` overrides GIT_ONTO_GRAPH. With `world` (an owlready2 World already loaded, as in the web app) the
+    owlready2 backend queries it instead of loading the graph again.
+    """
+    backend = backend or default_backend()
+    path = path or graph_path()
+    if backend == "memory":
+        return RdflibStore(load_graph(path), backend, path, lambda: load_graph(path))
+    if backend == "snapshot":
+        return RdflibStore(open_snapshot(path), backend, path, lambda: open_snapshot(path))
+    if backend == "cached":
+        def load():
+            return open_snapshot(cached_snapshot(path))
+        return RdflibStore(load(), backend, path, load)
+    if backend == "owlready2":
+        db = os.getenv("GIT_ONTO_DB")
+        if world is None:
+            from owlready2 import World
+            if db:
+                from incremental_populate import load_world
+                world = load_world(db)
+            else:
+                world = World()
+                world.get_ontology(f"file://{os.path.abspath(path)}").load()
+        return OwlreadyStore(world, db or path, live=bool(db))
+    if backend == "oxigraph":
+        return OxigraphStore(os.getenv("GIT_ONTO_OXIGRAPH", DEFAULT_OXIGRAPH), path)
+    raise ValueError(f"unknown graph store backend {backend!r} (expected one of: {', '.join(BACKENDS)})")
@@ -0,0 +1,436 @@
+# --------------------------------------------------------
+# Incremental population for populate_graph.py --db
+# --------------------------------------------------------
+# The populated ontology lives in a persistent owlready2 SQLite quadstore.
+# Next to the quadstore tables, populate_rows keeps one content hash per
+# entity: the hash of all data rows that build one individual (a repo, a
+# user, a commit, ...) or one branch membership link. A refresh hashes the
+# current data/*.json rows, diffs them against the stored hashes and only
+# destroys, updates or creates the individuals whose rows were removed,
+# changed or added. Quadstore writes and the new hashes are committed
+# together by world.save(), so an interrupted refresh leaves the previous
+# state intact.
+import ast, hashlib, json, os, time
+from pathlib import Path
+
+from owlready2 import World, destroy_entity
+
+from populate_graph import (DATA_DIR, SCHEMA_FILE, BranchResolver, OntologyBuilder, StageReport, infer_branch,
+                            infer_commit, load_json, populate, repo_iri, user_iri, branch_iri, commit_iri, file_iri,
+                            change_iri, issue_iri, pr_iri)
+
+DB_FILE = "ontology/git-onto-logic.sqlite3"
+ONTO_IRI = "http://example.org/git-onto-logic#"
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS populate_rows (
+    kind TEXT NOT NULL,
+    key  TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (kind, key)
+)
+"""
+
+# kind → (data file, key of the entity a row belongs to), in build order.
+SOURCES = {
+    "repos":           ("repos.json",           lambda r: [r["repo_id"]]),
+    "users":           ("users.json",           lambda u: [u["user_login"]]),
+    "branches":        ("branches.json",        lambda b: [b["repo_id"], b["branch_name"]]),
+    "commits":         ("commits.json",         lambda c: [c["commit_sha"]]),
+    "commit_branches": ("commit_branches.json", lambda m: [m["repo_id"], m["branch_name"], m["commit_sha"]]),
+    "files":           ("files.json",           lambda f: [f["commit_sha"], f["file_name"]]),
+    "issues":          ("issues.json",          lambda i: [i["issue_id"]]),
+    "pulls":           ("pulls.json",           lambda p: [p["pr_id"]]),
+}
+
+ENTITY_IRI = {
+    "repos":    repo_iri,
+    "users":    user_iri,
+    "branches": branch_iri,
+    "commits":  commit_iri,
+    "files":    change_iri,
+    "issues":   issue_iri,
+    "pulls":    pr_iri,
+}
+
+# Where the commit SHA sits in the keys of rows rebuilt along with their commit.
+COMMIT_OF = {
+    "commit_branches": lambda key: key[2],
+    "files":           lambda key: key[0],
+}
+
+
+def read_rows(kind):
+    fname, _ = SOURCES[kind]
+    return load_json(fname) if (DATA_DIR / fname).exists() else []
+
+
+def entity_key(kind, row):
+    return repr(tuple(SOURCES[kind][1](row)))
+
+
+def key_parts(key):
+    return ast.literal_eval(key)
+
+
+def scan(kind):
+    """{entity key: content hash} over the current rows of one kind.
+
+    A row hashes to 64 bits; an entity's hash is the sum of its rows' hashes,
+    so it does not depend on where the rows sit in the file.
+    """
+    sums = {}
+    for row in read_rows(kind):
+        digest = hashlib.blake2b(json.dumps(row, sort_keys=True, ensure_ascii=False).encode(),
+                                 digest_size=8).digest()
+        key = entity_key(kind, row)
+        sums[key] = (sums.get(key, 0) + int.from_bytes(digest, "big")) & 0xFFFFFFFFFFFFFFFF
+    return {key: f"{value:016x}" for key, value in sums.items()}
+
+
+def save_hashes(db, kind, current, keys, removed=()):
+    db.executemany("DELETE FROM populate_rows WHERE kind = ? AND key = ?", [(kind, k) for k in removed])
+    db.executemany("INSERT OR REPLACE INTO populate_rows (kind, key, hash) VALUES (?, ?, ?)",
+                   [(kind, k, current[k]) for k in keys])
+
+
+class Refresh:
+    """Applies one diff of the dataset to the ontology in the quadstore.
+
+    A commit is rebuilt as a unit with its branch memberships and files:
+    whether it exists at all depends on its row's branch, so commits whose
+    branch appeared or disappeared are rebuilt too, as are those whose
+    author or committer only now has a user row.
+
+    The aggregate counts are re-derived only for the individuals a link
+    was added to or removed from, from the graph around each of them.
+    """
+
+    def __init__(self, onto):
+        self.onto = onto
+        self.world = onto.world
+        self.builder = OntologyBuilder(onto, incremental=True)
+        self.touched_commits = set()   # IRI names whose Merge/InitialCommit type is re-derived
+        self.touched_branches = set()  # IRI names whose mergedInto / UnmergedBranch is re-derived
+        self.dirty_repos = set()       # repos whose PRs must be re-resolved against their branches
+        self.children = {}             # sha of a rebuilt commit → names of commits that have it as parent
+        self.parents = set()           # names of the parents of rebuilt commits
+        self.files = set()             # names of Files that lost a FileChange
+        self.counted = set()           # names of Users, Branches, Repositories and Files to recount
+
+    def entity(self, kind, key):
+        return self.onto[ENTITY_IRI[kind](*key_parts(key))]
+
+    def note_commit(self, commit):
+        """Recount the branches and authors of a commit whose links change."""
+        self.counted.update(b.name for b in self.world.search(hasCommit=commit))
+        self.counted.update(u.name for u in commit.authoredBy)
+
+    def remove(self, kind, key):
+        """Destroy the individual (or membership link) of a removed entity."""
+        if kind == "commit_branches":
+            repo_id, branch_name, sha = key_parts(key)
+            branch, commit = self.onto[branch_iri(repo_id, branch_name)], self.onto[commit_iri(sha)]
+            if branch and commit and commit in branch.hasCommit:
+                self.note_commit(commit)
+                branch.hasCommit.remove(commit)
+            return
+        ind = self.entity(kind, key)
+        if ind is None:
+            return
+        if kind == "branches":
+            self.dirty_repos.add(key_parts(key)[0])
+            for commit in ind.hasCommit:
+                self.counted.update(u.name for u in commit.authoredBy)
+        elif kind == "pulls":
+            self.touched_branches.update(b.name for b in ind.hasHeadBranch)
+        elif kind == "files":
+            self.files.update(f.name for f in ind.ofFile)
+        destroy_entity(ind)
+
+    def drop_changes(self, commit):
+        for change in self.world.search(inCommit=commit):
+            self.files.update(f.name for f in change.ofFile)
+            destroy_entity(change)
+
+    def tear_down(self, sha):
+        """Destroy a commit and its files ahead of rebuilding them from rows."""
+        commit = self.onto[commit_iri(sha)]
+        if commit is None:
+            return
+        self.children[sha] = [c.name for c in self.world.search(parent=commit)]
+        self.touched_commits.update(self.children[sha])
+        self.parents.update(p.name for p in commit.parent)
+        self.note_commit(commit)
+        self.drop_changes(commit)
+        destroy_entity(commit)
+
+    def relink_children(self):
+        """Give torn-down commits their child links back (as placeholders if they got no row)
+        and drop placeholders that lost their last child."""
+        for sha, names in self.children.items():
+            children = [c for c in map(self.onto.__getitem__, names) if c is not None]
+            if not children:
+                continue
+            commit = self.builder.commit(sha)
+            if commit is None:
+                commit = self.builder.commit_map[sha] = self.onto.Commit(commit_iri(sha))
+                self.touched_commits.add(commit.name)
+            for child in children:
+                if commit not in child.parent:
+                    child.parent.append(commit)
+        # A placeholder (a parent with no row of its own) goes when its last child does.
+        for name in self.parents:
+            commit = self.onto[name]
+            if commit is not None and not commit.commitSHA and not self.world.search_one(parent=commit):
+                self.note_commit(commit)
+                self.drop_changes(commit)
+                destroy_entity(commit)
+
+    def drop_orphan_files(self):
+        """Drop the Files whose last FileChange went."""
+        for name in self.files:
+            file_ind = self.onto[name]
+            if file_ind is not None and not self.world.search_one(ofFile=file_ind):
+                destroy_entity(file_ind)
+
+    def reset(self, kind, ind):
+        """Drop the links a changed issue or PR produces, before re-adding them."""
+        if kind == "issues":
+            ind.openedBy = []
+        elif kind == "pulls":
+            self.touched_branches.update(b.name for b in ind.hasHeadBranch)
+            ind.openedBy = []
+            ind.hasBaseBranch = []
+            ind.hasHeadBranch = []
+            ind.mergedAt = []
+            if self.onto.MergedPullRequest in ind.is_a:
+                ind.is_a.remove(self.onto.MergedPullRequest)
+
+    def add(self, kind, row, resolver=None):
+        b = self.builder
+        if kind == "repos":
+            b.add_repo(row)
+        elif kind == "users":
+            b.add_user(row)
+        elif kind == "branches":
+            b.add_branch(row)
+            self.touched_branches.add(branch_iri(row["repo_id"], row["branch_name"]))
+        elif kind == "commits":
+            b.add_commit(row)
+            self.touched_commits.update(commit_iri(sha) for sha in [row["commit_sha"], *row.get("commit_parents", [])])
+            commit = self.onto[commit_iri(row["commit_sha"])]
+            if commit is not None:
+                self.note_commit(commit)
+        elif kind == "commit_branches":
+            b.add_membership(row)
+            commit = self.onto[commit_iri(row["commit_sha"])]
+            if commit is not None:
+                self.note_commit(commit)
+        elif kind == "files":
+            b.add_file(row)
+            self.counted.add(file_iri(row["repo_id"], row["file_name"]))
+        elif kind == "issues":
+            b.add_issue(row)
+        else:
+            b.add_pr(row, resolver)
+            pr = self.onto[pr_iri(row["pr_id"])]
+            if pr is not None:
+                self.touched_branches.update(br.name for br in pr.hasHeadBranch)
+
+    def resolver(self, repo_ids):
+        """BranchResolver over the branches of `repo_ids`, in branches.json order."""
+        branch_map = {}
+        for b in read_rows("branches"):
+            if b["repo_id"] in repo_ids:
+                branch = self.builder.branch(b["repo_id"], b["branch_name"])
+                if branch:
+                    branch_map[(b["repo_id"], b["branch_name"])] = branch
+        return BranchResolver(branch_map)
+
+    def reinfer(self):
+        onto = self.onto
+        for name in self.touched_branches:
+            branch = onto[name]
+            if branch is None:
+                continue
+            bases = []
+            for pr in self.world.search(hasHeadBranch=branch):
+                if pr.mergedAt and pr.hasBaseBranch and pr.hasBaseBranch[0] not in bases:
+                    bases.append(pr.hasBaseBranch[0])
+            branch.mergedInto = bases
+            if bases and onto.UnmergedBranch in branch.is_a:
+                branch.is_a.remove(onto.UnmergedBranch)
+            infer_branch(onto, branch)
+        for name in self.touched_commits:
+            commit = onto[name]
+            if commit is None:
+                continue
+            for cls in (onto.MergeCommit, onto.InitialCommit):
+                if cls in commit.is_a:
+                    commit.is_a.remove(cls)
+            infer_commit(onto, commit)
+
+    def recount(self):
+        """Write the aggregates of the counted individuals, as run_queries.py
+        --check-aggregates derives them from the graph; returns how many were counted."""
+        onto, world = self.onto, self.world
+        self.counted.update(map(repo_iri, self.dirty_repos))
+        self.counted.update(self.touched_branches, self.files)
+        for name in self.touched_branches:
+            branch = onto[name]
+            if branch is not None:
+                self.counted.update(r.name for r in world.search(hasBranch=branch))
+        for name in self.counted:
+            ind = onto[name]
+            if isinstance(ind, onto.User):
+                commits = set(world.search(authoredBy=ind))
+                repos = {r for c in commits for b in world.search(hasCommit=c) for r in world.search(hasBranch=b)}
+                counts = {"commitCount": len(commits), "repoCount": len(repos)}
+            elif isinstance(ind, onto.Branch):
+                counts = {"commitCount": len(set(ind.hasCommit))}
+            elif isinstance(ind, onto.Repository):
+                counts = {"unmergedBranchCount": sum(isinstance(b, onto.UnmergedBranch) for b in set(ind.hasBranch))}
+            elif isinstance(ind, onto.File):
+                counts = {"modificationCount": len({c for change in world.search(ofFile=ind) for c in change.inCommit})}
+            else:
+                continue
+            for prop, count in counts.items():
+                if getattr(ind, prop) != [count]:
+                    setattr(ind, prop, [count])
+        return len(self.counted)
+
+
+_readers = {}
+
+
+def load_world(path):
+    """Read-only World on the quadstore at `path`, shared within the process.
+
+    Two Worlds on one SQLite file in the same process lock each other, so
+    every reader (the Flask app, run_queries.py) goes through this.
+    """
+    path = os.path.abspath(path)
+    if path not in _readers:
+        world = World()
+        world.set_backend(filename=path, exclusive=False)
+        _readers[path] = world
+    return _readers[path]
+
+
+def open_world(path):
+    world = World()
+    world.set_backend(filename=path)
+    fresh = ONTO_IRI not in world.ontologies
+    if fresh:
+        onto = world.get_ontology(Path(SCHEMA_FILE).resolve().as_uri()).load()
+    else:
+        onto = world.get_ontology(ONTO_IRI)
+    world.graph.db.execute(STATE_SCHEMA)
+    return world, onto, fresh
+
+
+def refresh(path=DB_FILE, report=None):
+    """Bring the quadstore at `path` up to date with data/*.json; returns its ontology."""
+    started = time.perf_counter()
+    report = report or StageReport()
+    world, onto, fresh = open_world(path)
+    db = world.graph.db
+
+    if fresh:
+        populate(onto, report)
+        for kind in SOURCES:
+            current = scan(kind)
+            save_hashes(db, kind, current, current)
+        report("hashes")
+        world.save()
+        report("save")
+        print(f"✅ Built {path} from scratch ({time.perf_counter() - started:.1f}s)")
+        return onto
+
+    # === Diff the current rows against the stored hashes ===
+    diff = {}
+    for kind in SOURCES:
+        current = scan(kind)
+        stored = dict(db.execute("SELECT key, hash FROM populate_rows WHERE kind = ?", (kind,)))
+        added = current.keys() - stored.keys()
+        changed = {k for k in current.keys() & stored.keys() if current[k] != stored[k]}
+        removed = stored.keys() - current.keys()
+        save_hashes(db, kind, current, added | changed, removed)
+        diff[kind] = (added, changed, removed)
+        print(f"  {kind:16s} +{len(added)} ~{len(changed)} -{len(removed)}")
+    report("diff")
+
+    run = Refresh(onto)
+    moved = {key_parts(k) for k in diff["branches"][0] | diff["branches"][2]}
+    run.dirty_repos = {repo_id for repo_id, _ in moved}
+    new_users = {key_parts(k)[0] for k in diff["users"][0]}
+    run.counted = ({repo_iri(key_parts(k)[0]) for k in diff["repos"][0] | diff["repos"][1]}
+                   | {user_iri(key_parts(k)[0]) for k in diff["users"][0] | diff["users"][1]})
+
+    # === Commits to rebuild with their memberships and files ===
+    shas = {key_parts(k)[0] for k in set().union(*diff["commits"])}
+    if moved or new_users:
+        for c in read_rows("commits"):
+            if ((c["repo_id"], c["branch_name"]) in moved or c.get("commit_author_login") in new_users
+                    or c.get("commit_committer_login") in new_users):
+                shas.add(c["commit_sha"])
+
+    # === Removals, dependents first ===
+    for kind in reversed(list(SOURCES)):
+        for key in diff[kind][2]:
+            if kind == "commits":
+                continue  # torn down below
+            if kind in ("commit_branches", "files") and COMMIT_OF[kind](key_parts(key)) in shas:
+                continue  # comes back with its commit
+            run.remove(kind, key)
+    for sha in shas:
+        run.tear_down(sha)
+    report("removals")
+
+    # === Rows to (re-)add ===
+    def wanted(kind, row):
+        if entity_key(kind, row) in diff[kind][0] | diff[kind][1]:
+            return True
+        if kind == "commit_branches" and (row["repo_id"], row["branch_name"]) in moved:
+            return True
+        if kind in ("commits", "commit_branches", "files"):
+            return row["commit_sha"] in shas
+        if kind == "pulls" and row["repo_id"] in run.dirty_repos:
+            return True
+        return kind in ("issues", "pulls") and row.get("user_login") in new_users
+
+    def affected(kind):
+        return bool(diff[kind][0] or diff[kind][1]
+                    or (shas and kind in ("commits", "commit_branches", "files"))
+                    or (moved and kind in ("commit_branches", "pulls"))
+                    or (new_users and kind in ("issues", "pulls")))
+
+    rows = {kind: [r for r in read_rows(kind) if wanted(kind, r)] if affected(kind) else [] for kind in SOURCES}
+
+    # === Upserts, in build order ===
+    for kind in SOURCES:
+        if kind in ("issues", "pulls"):
+            for key in {entity_key(kind, r) for r in rows[kind]} - diff[kind][0]:
+                ind = run.entity(kind, key)
+                if ind is not None:
+                    run.reset(kind, ind)
+        resolver = run.resolver({r["repo_id"] for r in rows[kind]}) if kind == "pulls" else None
+        for row in rows[kind]:
+            run.add(kind, row, resolver)
+        if kind == "commits":
+            run.relink_children()
+    run.drop_orphan_files()
+    report("upserts")
+
+    run.reinfer()
+    report("inference")
+    total = sum(len(a) + len(c) + len(r) for a, c, r in diff.values())
+    if total:
+        print(f"  {'aggregates':16s} {run.recount()} individuals recounted")
+        report("aggregates")
+    world.save()
+    report("save")
+    print(f"✅ Refreshed {path}: {total} entities changed, {len(shas)} commits rebuilt "
+          f"({time.perf_counter() - started:.1f}s)")
+    return onto
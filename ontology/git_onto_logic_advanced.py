@@ -9,6 +9,7 @@ with onto:
     class Commit(Thing): pass
     class User(Thing): pass
     class File(Thing): pass
+    class FileChange(Thing): pass
     class PullRequest(Thing): pass
     class Issue(Thing): pass
 
@@ -32,6 +33,7 @@ with onto:
     class onBranch(ObjectProperty):
         domain = [Commit]
         range  = [Branch]
+        inverse_property = hasCommit
 
     class authoredBy(ObjectProperty):
         domain = [Commit]
@@ -45,8 +47,16 @@ with onto:
         domain = [Commit]
         range  = [Commit]
 
-    class updatesFile(ObjectProperty):
-        domain = [Commit]
+    class containsFile(ObjectProperty):
+        domain = [Repository]
+        range  = [File]
+
+    class inCommit(ObjectProperty):
+        domain = [FileChange]
+        range  = [Commit]
+
+    class ofFile(ObjectProperty):
+        domain = [FileChange]
         range  = [File]
 
     class hasIssue(ObjectProperty):
@@ -92,8 +102,8 @@ with onto:
     class isInitial(DataProperty): domain = [Commit]; range = [bool]
 
     class fileName(DataProperty): domain = [File]; range = [str]
-    class fileStatus(DataProperty): domain = [File]; range = [str]
-    class fileChanges(DataProperty): domain = [File]; range = [int]
+    class fileStatus(DataProperty): domain = [FileChange]; range = [str]
+    class fileChanges(DataProperty): domain = [FileChange]; range = [int]
 
     class title(DataProperty): domain = [Issue, PullRequest]; range = [str]
     class state(DataProperty): domain = [Issue, PullRequest]; range = [str]
@@ -102,6 +112,12 @@ with onto:
     class userLogin(DataProperty): domain = [User]; range = [str]
     class userURL(DataProperty): domain = [User]; range = [str]
 
+    # Aggregates (materialised by populate_graph.py)
+    class commitCount(DataProperty): domain = [User, Branch]; range = [int]
+    class repoCount(DataProperty): domain = [User]; range = [int]
+    class unmergedBranchCount(DataProperty): domain = [Repository]; range = [int]
+    class modificationCount(DataProperty): domain = [File]; range = [int]
+
     # Logical Restrictions 
     Repository.is_a.append(hasBranch.min(1, Branch))
     Branch.is_a.append(hasCommit.min(1, Commit))
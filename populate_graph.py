@@ -2,252 +2,702 @@
 # Git-Onto-Logic Ontology Population Script (Final Version)
 # Author: Saayella
 # --------------------------------------------------------
-import json
+import argparse, json, re, sys, time
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate
 from pathlib import Path
 from owlready2 import *
-
-# === Load ontology schema ===
-onto = get_ontology("ontology/git-onto-logic-redesigned.owl").load()
+from data_io import iter_records, peak_rss_mb
 
 # === Dataset folder path ===
 DATA_DIR = Path("data")
+SCHEMA_FILE = "ontology/git-onto-logic-redesigned.owl"
+OWL_OUTPUT = "ontology/git-onto-logic-populated.owl"
+NT_OUTPUT = "ontology/git-onto-logic-populated.nt"
+SNAPSHOT_OUTPUT = "ontology/git-onto-logic-populated.snap"
 
-# === Helper: load JSON ===
+# === Helper: load JSON (array or NDJSON, read lazily) ===
 def load_json(filename):
-    path = DATA_DIR / filename
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-# === Load dataset files ===
-repos    = load_json("repos.json")
-branches = load_json("branches.json")
-commits  = load_json("commits.json")
-users    = load_json("users.json")
-files    = load_json("files.json")
-issues   = load_json("issues.json")
-prs      = load_json("pulls.json")
-
-# === Cache dictionaries ===
-repo_map = {}
-branch_map = {}
-user_map = {}
-commit_map = {}
-
-# --------------------------------------------------------
-# === Create repository individuals ===
-# --------------------------------------------------------
-for r in repos:
-    repo_iri = f"repo_{r['repo_id']}"
-    repo = onto.Repository(repo_iri)
-    repo.repoName = [r.get("repo_name", "Unknown")]
-    repo.repoLanguage = [r.get("repo_language") or "Unknown"]
-    repo.repoStars = [int(r.get("repo_stars", 0))]
-    repo.repoForks = [int(r.get("repo_forks", 0))]
-    repo_map[r["repo_id"]] = repo
-
-# --------------------------------------------------------
-# === Create user individuals ===
-# --------------------------------------------------------
-for u in users:
-    safe_login = u["user_login"].replace("/", "_")
-    user = onto.User(f"user_{safe_login}")
-    user.userLogin = [u["user_login"]]
-    user.userURL = [u.get("user_url", "")]
-    user_map[u["user_login"]] = user
-
-# --------------------------------------------------------
-# === Create branches and link to repos ===
-# --------------------------------------------------------
-for b in branches:
-    repo_id = b["repo_id"]
-    repo = repo_map.get(repo_id)
-    if not repo:
-        continue
-
-    branch_name = b["branch_name"].replace("/", "_")
-    branch_iri = f"repo_{repo_id}__branch_{branch_name}"
-    branch = onto.Branch(branch_iri)
-    branch.branchName = [b["branch_name"]]
-    branch.isDefault = [bool(b.get("is_default", False))]
-    branch_map[(repo_id, b["branch_name"])] = branch
-    repo.hasBranch.append(branch)
-
-# --------------------------------------------------------
-# === Create commits and link ===
-# --------------------------------------------------------
-for c in commits:
-    repo_id = c["repo_id"]
-    branch_key = (repo_id, c["branch_name"])
-    branch = branch_map.get(branch_key)
-    if not branch:
-        continue
-
-    safe_sha = c["commit_sha"].replace("/", "_")
-    commit_iri = f"commit_{safe_sha}"
-
-    commit = commit_map.get(c["commit_sha"])
-    if not commit:
-        commit = onto.Commit(commit_iri)
-        commit_map[c["commit_sha"]] = commit
-
-    commit.commitSHA = [c["commit_sha"]]
-    commit.message = [c.get("commit_message", "")]
-    commit.commitDate = [c.get("commit_date", "")]
-    commit.isInitial = [bool(c.get("is_initial", False))]
-
-    branch.hasCommit.append(commit)
-    commit.onBranch.append(branch)
-
-    author_login = c.get("commit_author_login")
-    committer_login = c.get("commit_committer_login")
-
-    if author_login and author_login in user_map:
-        commit.authoredBy.append(user_map[author_login])
-    if committer_login and committer_login in user_map:
-        commit.committedBy.append(user_map[committer_login])
-
-    commit_map[c["commit_sha"]] = commit
-
-    parents = c.get("commit_parents", [])
-    for psha in parents:
-        safe_parent_sha = psha.replace("/", "_")
-        parent_commit = commit_map.get(psha)
-        if not parent_commit:
-            parent_commit = onto.Commit(f"commit_{safe_parent_sha}")
-            commit_map[psha] = parent_commit
-        commit.parent.append(parent_commit)
-
-    msg = c.get("commit_message", "").lower()
-    if any(k in msg for k in ["security", "vulnerability"]):
-        commit.is_a.append(onto.SecurityCommit)
+    return iter_records(DATA_DIR / filename)
+
+# === Helper: per-stage progress with peak memory ===
+class StageReport:
+    """Prints rows, time and peak RSS of each population stage as it ends."""
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.last = time.perf_counter()
+        self.count = 0
+
+    def rows(self, rows):
+        for row in rows:
+            self.count += 1
+            yield row
+
+    def __call__(self, stage):
+        if self.quiet:
+            return
+        now = time.perf_counter()
+        rows = f"{self.count} rows, " if self.count else ""
+        print(f"  {stage:16s} {rows}{now - self.last:.1f}s, peak RSS {peak_rss_mb():.0f} MB")
+        self.last, self.count = now, 0
+
+# === Helper: per-repo branch lookups for PR linking ===
+DEFAULT_BRANCH_NAMES = ("main", "master")
+
+class BranchResolver:
+    """Resolves PR base/head branch names against the branches of each repo.
+
+    Built once from branch_map; gives the same answers as scanning
+    branch_map in order with the exact → partial → main/master rules:
+      * exact: case-folded name (the last branch with that name wins)
+      * partial: first branch whose name contains the query; all names of a
+        repo are joined into one string so this is a single str.find() plus
+        a bisect, memoised per query
+      * fallback: first main/master branch for a base, first other branch
+        for a head
+    """
+
+    def __init__(self, branch_map):
+        self._repos = {}
+        for (repo_id, name), branch in branch_map.items():
+            self._repos.setdefault(repo_id, []).append((name.lower(), branch))
+        self._index = {repo_id: self._build(entries) for repo_id, entries in self._repos.items()}
+
+    @staticmethod
+    def _build(entries):
+        exact, offsets, parts, pos = {}, [], [], 0
+        for name, branch in entries:
+            exact[name] = branch
+            offsets.append(pos)
+            parts.append(name)
+            pos += len(name) + 1
+        return {
+            "exact": exact,
+            "branches": [b for _, b in entries],
+            "haystack": "\0".join(parts),
+            "offsets": offsets,
+            "partial": {},
+            "base": next((b for n, b in entries if n in DEFAULT_BRANCH_NAMES), None),
+            "head": next((b for n, b in entries if n not in DEFAULT_BRANCH_NAMES), None),
+        }
+
+    def _partial(self, idx, name):
+        if name not in idx["partial"]:
+            pos = idx["haystack"].find(name)
+            idx["partial"][name] = idx["branches"][bisect_right(idx["offsets"], pos) - 1] if pos >= 0 else None
+        return idx["partial"][name]
+
+    def resolve(self, repo_id, name, role):
+        """Branch for a lower-cased PR branch name; role is "base" or "head"."""
+        idx = self._index.get(repo_id)
+        if not idx:
+            return None
+        return idx["exact"].get(name) or self._partial(idx, name) or idx[role]
+
+# === Helper: IRI names of the individuals ===
+def repo_iri(repo_id):
+    return f"repo_{repo_id}"
+
+def user_iri(login):
+    return f"user_{login.replace('/', '_')}"
+
+def branch_iri(repo_id, name):
+    return f"repo_{repo_id}__branch_{name.replace('/', '_')}"
+
+def commit_iri(sha):
+    return f"commit_{sha.replace('/', '_')}"
+
+def file_iri(repo_id, path):
+    return f"repo_{repo_id}__file_{path.replace('/', '_').replace(' ', '_')}"
+
+def change_iri(sha, path):
+    return f"{sha}__{path.replace('/', '_').replace(' ', '_')}"
+
+def issue_iri(issue_id):
+    return f"issue_{issue_id}"
+
+def pr_iri(pr_id):
+    return f"pr_{pr_id}"
 
 # --------------------------------------------------------
-# === Create files and link to commits ===
+# === Individuals from dataset rows ===
 # --------------------------------------------------------
-for fobj in files:
-    commit_sha = fobj["commit_sha"]
-    commit = commit_map.get(commit_sha)
-    if not commit:
-        continue
-
-    safe_file = fobj["file_name"].replace("/", "_").replace(" ", "_")
-    file_iri = f"{commit_sha}__{safe_file}"
-    file_ind = onto.File(file_iri)
-    file_ind.fileName = [fobj["file_name"]]
-    file_ind.fileStatus = [fobj.get("file_status", "modified")]
-    file_ind.fileChanges = [int(fobj.get("file_changes", 0))]
-    commit.updatesFile.append(file_ind)
-
-# --------------------------------------------------------
-# === Create issues and link ===
-# --------------------------------------------------------
-for iobj in issues:
-    repo = repo_map.get(iobj["repo_id"])
-    if not repo:
-        continue
-
-    issue_iri = f"issue_{iobj['issue_id']}"
-    issue = onto.Issue(issue_iri)
-    issue.title = [iobj.get("title", "Untitled")]
-    issue.state = [iobj.get("state", "open")]
-    repo.hasIssue.append(issue)
-
-    user_login = iobj.get("user_login")
-    if user_login and user_login in user_map:
-        issue.openedBy.append(user_map[user_login])
-
-# --------------------------------------------------------
-# === Create pull requests and link (with robust fallback) ===
-# --------------------------------------------------------
-for pobj in prs:
-    repo = repo_map.get(pobj["repo_id"])
-    if not repo:
-        continue
-
-    pr_iri = f"pr_{pobj['pr_id']}"
-    pr = onto.PullRequest(pr_iri)
-    pr.title = [pobj.get("title", "Untitled PR")]
-    pr.state = [pobj.get("state", "open")]
-
-    merged_at_value = pobj.get("merged_at")
-    if merged_at_value:
-        pr.mergedAt = [merged_at_value]
-
-    repo.hasPullRequest.append(pr)
-
-    # Link to user
-    user_login = pobj.get("user_login")
-    if user_login and user_login in user_map:
-        pr.openedBy.append(user_map[user_login])
-
-    # === Robust base/head branch linking ===
-    repo_id = pobj["repo_id"]
-    base_name = (pobj.get("base_branch") or "").lower()
-    head_name = (pobj.get("head_branch") or "").lower()
-
-    base_branch = None
-    head_branch = None
-
-    # 1️⃣ Try exact match
-    for (rid, bname), b in branch_map.items():
-        if rid != repo_id:
-            continue
-        if bname.lower() == base_name:
-            base_branch = b
-        if bname.lower() == head_name:
-            head_branch = b
-
-    # 2️⃣ Try partial match if not found
-    if not base_branch:
-        for (rid, bname), b in branch_map.items():
-            if rid == repo_id and base_name in bname.lower():
-                base_branch = b
-                break
-    if not head_branch:
-        for (rid, bname), b in branch_map.items():
-            if rid == repo_id and head_name in bname.lower():
-                head_branch = b
-                break
-
-    # 3️⃣ Fallback: use any 'main' or 'master' branch as base
-    if not base_branch:
-        for (rid, bname), b in branch_map.items():
-            if rid == repo_id and bname.lower() in ["main", "master"]:
-                base_branch = b
-                break
-    if not head_branch:
-        for (rid, bname), b in branch_map.items():
-            if rid == repo_id and bname.lower() not in ["main", "master"]:
-                head_branch = b
-                break
-
-    # Link branches to PR
-    if base_branch:
-        pr.hasBaseBranch.append(base_branch)
-    if head_branch:
-        pr.hasHeadBranch.append(head_branch)
-
-    # 4️⃣ If merged, assert mergedInto relation
-    if merged_at_value and base_branch and head_branch:
-        head_branch.mergedInto.append(base_branch)
+class OntologyBuilder:
+    """Creates the individuals of dataset rows in `onto`, one row at a time.
+
+    populate() feeds it every row of a fresh ontology. With incremental=True
+    (the --db mode) it is fed only changed rows of an ontology populated by
+    an earlier run: lookups then fall back to the ontology and links are
+    only added when missing.
+
+    With `classes` (a Memberships from derive_memberships()) each
+    individual gets its precomputed inferred classes as it is created;
+    without, only the row-local SecurityCommit and MergedPullRequest are
+    asserted and the rest is left to infer_commit() / infer_branch().
+    """
+
+    def __init__(self, onto, incremental=False, classes=None):
+        self.onto = onto
+        self.incremental = incremental
+        self.classes = classes
+        # === Cache dictionaries ===
+        self.repo_map = {}
+        self.branch_map = {}
+        self.user_map = {}
+        self.commit_map = {}
+        self.file_map = {}         # (repo_id, path) → canonical File
+        self.linked_pairs = set()  # (branch key, sha) already linked via hasCommit
+
+    def _lookup(self, cache, key, name):
+        found = cache.get(key)
+        if found is None and self.incremental:
+            found = self.onto[name]
+            if found is not None:
+                cache[key] = found
+        return found
+
+    def repo(self, repo_id):
+        return self._lookup(self.repo_map, repo_id, repo_iri(repo_id))
+
+    def user(self, login):
+        return self._lookup(self.user_map, login, user_iri(login)) if login else None
+
+    def branch(self, repo_id, name):
+        return self._lookup(self.branch_map, (repo_id, name), branch_iri(repo_id, name))
+
+    def commit(self, sha):
+        return self._lookup(self.commit_map, sha, commit_iri(sha))
+
+    def file(self, repo_id, path):
+        return self._lookup(self.file_map, (repo_id, path), file_iri(repo_id, path))
+
+    def _append(self, values, item):
+        if not (self.incremental and item in values):
+            values.append(item)
+
+    def _classify(self, ind, cls):
+        if cls not in ind.is_a:
+            ind.is_a.append(cls)
+
+    def new_commit(self, sha):
+        commit = self.commit_map[sha] = self.onto.Commit(commit_iri(sha))
+        if self.classes is not None:
+            if sha in self.classes.merge_commits:
+                self._classify(commit, self.onto.MergeCommit)
+            elif sha in self.classes.initial_commits:
+                self._classify(commit, self.onto.InitialCommit)
+        return commit
+
+    def link_commit(self, branch_key, branch, commit, sha):
+        if (branch_key, sha) in self.linked_pairs:
+            return
+        # onBranch is declared the inverse of hasCommit: one triple serves both.
+        self._append(branch.hasCommit, commit)
+        self.linked_pairs.add((branch_key, sha))
+
+    # --------------------------------------------------------
+    # === Create repository individuals ===
+    # --------------------------------------------------------
+    def add_repo(self, r):
+        repo = self.onto.Repository(repo_iri(r["repo_id"]))
+        repo.repoName = [r.get("repo_name", "Unknown")]
+        repo.repoLanguage = [r.get("repo_language") or "Unknown"]
+        repo.repoStars = [int(r.get("repo_stars", 0))]
+        repo.repoForks = [int(r.get("repo_forks", 0))]
+        self.repo_map[r["repo_id"]] = repo
+
+    # --------------------------------------------------------
+    # === Create user individuals ===
+    # --------------------------------------------------------
+    def add_user(self, u):
+        user = self.onto.User(user_iri(u["user_login"]))
+        user.userLogin = [u["user_login"]]
+        user.userURL = [u.get("user_url", "")]
+        self.user_map[u["user_login"]] = user
+
+    # --------------------------------------------------------
+    # === Create branches and link to repos ===
+    # --------------------------------------------------------
+    def add_branch(self, b):
+        repo_id = b["repo_id"]
+        repo = self.repo(repo_id)
+        if not repo:
+            return
+
+        branch = self.onto.Branch(branch_iri(repo_id, b["branch_name"]))
+        branch.branchName = [b["branch_name"]]
+        branch.isDefault = [bool(b.get("is_default", False))]
+        self.branch_map[(repo_id, b["branch_name"])] = branch
+        self._append(repo.hasBranch, branch)
+        if self.classes is not None and (repo_id, b["branch_name"]) not in self.classes.merged_branches:
+            self._classify(branch, self.onto.UnmergedBranch)
+
+    # --------------------------------------------------------
+    # === Create commits and link ===
+    # --------------------------------------------------------
+    def add_commit(self, c):
+        repo_id = c["repo_id"]
+        branch_key = (repo_id, c["branch_name"])
+        branch = self.branch(*branch_key)
+        if not branch:
+            return
+
+        commit = self.commit(c["commit_sha"]) or self.new_commit(c["commit_sha"])
+
+        commit.commitSHA = [c["commit_sha"]]
+        commit.message = [c.get("commit_message", "")]
+        commit.commitDate = [c.get("commit_date", "")]
+        commit.isInitial = [bool(c.get("is_initial", False))]
+
+        self.link_commit(branch_key, branch, commit, c["commit_sha"])
+
+        author = self.user(c.get("commit_author_login"))
+        committer = self.user(c.get("commit_committer_login"))
+        if author:
+            self._append(commit.authoredBy, author)
+        if committer:
+            self._append(commit.committedBy, committer)
+
+        for psha in c.get("commit_parents", []):
+            parent_commit = self.commit(psha) or self.new_commit(psha)
+            self._append(commit.parent, parent_commit)
+
+        if self.classes is None:
+            security = is_security_message(c.get("commit_message", ""))
+        else:
+            security = c["commit_sha"] in self.classes.security_commits
+        if security:
+            self._classify(commit, self.onto.SecurityCommit)
+
+    # --------------------------------------------------------
+    # === Link commits to every other branch they are on ===
+    # --------------------------------------------------------
+    def add_membership(self, m):
+        branch_key = (m["repo_id"], m["branch_name"])
+        if (branch_key, m["commit_sha"]) in self.linked_pairs:
+            return
+        branch = self.branch(*branch_key)
+        commit = self.commit(m["commit_sha"])
+        if branch and commit:
+            self.link_commit(branch_key, branch, commit, m["commit_sha"])
+
+    # --------------------------------------------------------
+    # === Create files (one per repo path) and per-commit changes ===
+    # --------------------------------------------------------
+    def add_file(self, fobj):
+        commit = self.commit(fobj["commit_sha"])
+        if not commit:
+            return
+
+        repo_id = fobj["repo_id"]
+        path = sys.intern(fobj["file_name"])
+        file_ind = self.file(repo_id, path)
+        if not file_ind:
+            file_ind = self.onto.File(file_iri(repo_id, path))
+            file_ind.fileName = [path]
+            self.file_map[(repo_id, path)] = file_ind
+            repo = self.repo(repo_id)
+            if repo:
+                self._append(repo.containsFile, file_ind)
+
+        change = self.onto.FileChange(change_iri(fobj["commit_sha"], path))
+        change.fileStatus = [fobj.get("file_status", "modified")]
+        change.fileChanges = [int(fobj.get("file_changes", 0))]
+        change.inCommit = [commit]
+        change.ofFile = [file_ind]
+
+    # --------------------------------------------------------
+    # === Create issues and link ===
+    # --------------------------------------------------------
+    def add_issue(self, iobj):
+        repo = self.repo(iobj["repo_id"])
+        if not repo:
+            return
+
+        issue = self.onto.Issue(issue_iri(iobj["issue_id"]))
+        issue.title = [iobj.get("title", "Untitled")]
+        issue.state = [iobj.get("state", "open")]
+        self._append(repo.hasIssue, issue)
+
+        user = self.user(iobj.get("user_login"))
+        if user:
+            self._append(issue.openedBy, user)
+
+    # --------------------------------------------------------
+    # === Create pull requests and link (with robust fallback) ===
+    # --------------------------------------------------------
+    def add_pr(self, pobj, branch_resolver):
+        repo = self.repo(pobj["repo_id"])
+        if not repo:
+            return
+
+        pr = self.onto.PullRequest(pr_iri(pobj["pr_id"]))
+        pr.title = [pobj.get("title", "Untitled PR")]
+        pr.state = [pobj.get("state", "open")]
+
+        merged_at_value = pobj.get("merged_at")
+        if merged_at_value:
+            pr.mergedAt = [merged_at_value]
+
+        self._append(repo.hasPullRequest, pr)
+        if self.classes is None:
+            merged = is_merged_pr(pobj)
+        else:
+            merged = pobj["pr_id"] in self.classes.merged_prs
+        if merged:
+            self._classify(pr, self.onto.MergedPullRequest)
+
+        # Link to user
+        user = self.user(pobj.get("user_login"))
+        if user:
+            self._append(pr.openedBy, user)
+
+        # === Robust base/head branch linking ===
+        repo_id = pobj["repo_id"]
+        base_name = (pobj.get("base_branch") or "").lower()
+        head_name = (pobj.get("head_branch") or "").lower()
+
+        # 1️⃣ exact match, 2️⃣ partial match, 3️⃣ main/master (base) or any other branch (head)
+        base_branch = branch_resolver.resolve(repo_id, base_name, "base")
+        head_branch = branch_resolver.resolve(repo_id, head_name, "head")
+
+        # Link branches to PR
+        if base_branch:
+            pr.hasBaseBranch.append(base_branch)
+        if head_branch:
+            pr.hasHeadBranch.append(head_branch)
+
+        # 4️⃣ If merged, assert mergedInto relation
+        if merged_at_value and base_branch and head_branch:
+            self._append(head_branch.mergedInto, base_branch)
+
+
+def populate(onto, report=None):
+    """Create every individual of the dataset in `onto` through owlready2.
+
+    Rows are streamed one file at a time, so only the individuals (not the
+    source rows) accumulate in memory. The inferred classes are derived
+    from the rows first and asserted as the individuals are created.
+    """
+    report = report or StageReport()
+    classes = derive_memberships()
+    report("rules")
+    builder = OntologyBuilder(onto, classes=classes)
+    for r in report.rows(load_json("repos.json")):
+        builder.add_repo(r)
+    report("repos")
+    for u in report.rows(load_json("users.json")):
+        builder.add_user(u)
+    report("users")
+    for b in report.rows(load_json("branches.json")):
+        builder.add_branch(b)
+    report("branches")
+    for c in report.rows(load_json("commits.json")):
+        builder.add_commit(c)
+    report("commits")
+    # Branch membership of deduplicated commits (older crawls do not have it).
+    if (DATA_DIR / "commit_branches.json").exists():
+        for m in report.rows(load_json("commit_branches.json")):
+            builder.add_membership(m)
+        report("commit_branches")
+    for fobj in report.rows(load_json("files.json")):
+        builder.add_file(fobj)
+    report("files")
+    for iobj in report.rows(load_json("issues.json")):
+        builder.add_issue(iobj)
+    report("issues")
+    branch_resolver = BranchResolver(builder.branch_map)
+    for pobj in report.rows(load_json("pulls.json")):
+        builder.add_pr(pobj, branch_resolver)
+    report("pulls")
+    print(f"🧠 Manual reasoning asserted: {classes.summary()}")
+    assert_aggregates(onto, derive_aggregates())
+    report("aggregates")
 
 # --------------------------------------------------------
 # === Manual reasoning (lightweight inference) ===
 # --------------------------------------------------------
-for c in onto.Commit.instances():
+# The inferred classes are computed column-wise from the rows before any
+# individual exists (derive_memberships), with the same row filters as
+# populate(). infer_commit() / infer_branch() re-derive them from an
+# existing individual instead, for the entities a --db refresh touched.
+SECURITY_KEYWORDS = ["security", "vulnerability"]
+SECURITY_PATTERN = re.compile("|".join(map(re.escape, SECURITY_KEYWORDS)))
+# Commit messages are scanned for keywords this many at a time.
+SCAN_CHUNK = 10000
+
+def is_security_message(message):
+    return SECURITY_PATTERN.search(message.lower()) is not None
+
+def is_merged_pr(p):
+    return p.get("state", "open") == "closed" and bool(p.get("merged_at"))
+
+def security_matches(messages):
+    """Indices of the messages that contain a security keyword.
+
+    The lower-cased messages are joined into one text that the keyword
+    alternation scans in a single pass, skipping to the next message after
+    each hit.
+    """
+    lowered = [m.lower() for m in messages]
+    text = "\0".join(lowered)
+    ends = list(accumulate(len(m) + 1 for m in lowered))
+    hits, pos = [], 0
+    while (match := SECURITY_PATTERN.search(text, pos)):
+        i = bisect_right(ends, match.start())
+        hits.append(i)
+        pos = ends[i]
+    return hits
+
+class Memberships:
+    """Inferred class memberships, keyed like OntologyBuilder's maps."""
+
+    def __init__(self):
+        self.merge_commits = set()     # sha
+        self.initial_commits = set()   # sha, including parents without a row of their own
+        self.security_commits = set()  # sha
+        self.merged_branches = set()   # (repo_id, name) of branches with a mergedInto link
+        self.merged_prs = set()        # pr_id
+
+    def summary(self):
+        return (f"{len(self.merge_commits)} MergeCommit, {len(self.initial_commits)} InitialCommit, "
+                f"{len(self.security_commits)} SecurityCommit, {len(self.merged_prs)} MergedPullRequest")
+
+def derive_memberships():
+    """Compute the Memberships of data/*.json without building any individual.
+
+    Only the columns the rules need are kept: repo ids, branch keys, each
+    commit's parent set and the PR merge fields.
+    """
+    classes = Memberships()
+    repo_ids = {r["repo_id"] for r in load_json("repos.json")}
+    branch_keys = {}   # (repo_id, name) → itself, in branches.json order for BranchResolver
+    for b in load_json("branches.json"):
+        if b["repo_id"] in repo_ids:
+            key = (b["repo_id"], b["branch_name"])
+            branch_keys[key] = key
+
+    # === Commits: parent counts and message keywords ===
+    parents = {}   # sha → parent shas, over every row of the commit
+    shas, messages = [], []
+    def scan_messages():
+        classes.security_commits.update(shas[i] for i in security_matches(messages))
+        shas.clear()
+        messages.clear()
+    for c in load_json("commits.json"):
+        if (c["repo_id"], c["branch_name"]) not in branch_keys:
+            continue
+        sha = c["commit_sha"]
+        commit_parents = parents.setdefault(sha, set())
+        for psha in c.get("commit_parents", []):
+            commit_parents.add(psha)
+            parents.setdefault(psha, set())
+        shas.append(sha)
+        messages.append(c.get("commit_message", ""))
+        if len(messages) >= SCAN_CHUNK:
+            scan_messages()
+    scan_messages()
+    for sha, commit_parents in parents.items():
+        if len(commit_parents) >= 2:
+            classes.merge_commits.add(sha)
+        elif not commit_parents:
+            classes.initial_commits.add(sha)
+
+    # === Pull requests: merged PRs and the branches they merge ===
+    resolver = BranchResolver(branch_keys)
+    for p in load_json("pulls.json"):
+        if p["repo_id"] not in repo_ids:
+            continue
+        if is_merged_pr(p):
+            classes.merged_prs.add(p["pr_id"])
+        head = merged_head(resolver, p)
+        if head:
+            classes.merged_branches.add(head)
+    return classes
+
+def merged_head(resolver, p):
+    """Key of the branch a pull request row links with mergedInto, or None."""
+    if not p.get("merged_at"):
+        return None
+    base = resolver.resolve(p["repo_id"], (p.get("base_branch") or "").lower(), "base")
+    head = resolver.resolve(p["repo_id"], (p.get("head_branch") or "").lower(), "head")
+    return head if base and head else None
+
+def infer_commit(onto, c):
     if len(c.parent) >= 2 and onto.MergeCommit not in c.is_a:
         c.is_a.append(onto.MergeCommit)
     elif len(c.parent) == 0 and onto.InitialCommit not in c.is_a:
         c.is_a.append(onto.InitialCommit)
 
-for b in onto.Branch.instances():
-    if not b.mergedInto:
+def infer_branch(onto, b):
+    if not b.mergedInto and onto.UnmergedBranch not in b.is_a:
         b.is_a.append(onto.UnmergedBranch)
 
-print("🧠 Manual reasoning complete: MergeCommit, InitialCommit, and UnmergedBranch inferred.")
+# --------------------------------------------------------
+# === Materialised aggregates ===
+# --------------------------------------------------------
+# Counts that queries 1, 2, 8, 11, 12 and the /authors page would
+# otherwise recompute from raw triples, stored as data properties of the
+# counted individuals: commitCount and repoCount of a User, commitCount of
+# a Branch, unmergedBranchCount of a Repository, modificationCount of a
+# File. Like the inferred classes they are derived from the rows, with the
+# filters populate() applies; run_queries.py --check-aggregates compares
+# them with the raw graph.
+class Aggregates:
+    """Per-individual counts, keyed like OntologyBuilder's maps."""
+
+    def __init__(self):
+        self.logins, self.repo_ids, self.branch_keys, self.file_keys = set(), set(), set(), set()
+        self.author_commits = Counter()      # login → commits authored
+        self.author_repos = Counter()        # login → repos whose branches hold those commits
+        self.branch_commits = Counter()      # (repo_id, name) → commits on the branch
+        self.repo_unmerged = Counter()       # repo_id → branches not merged into another
+        self.file_modifications = Counter()  # (repo_id, path) → commits that changed the file
+
+    def values(self):
+        """(individual name, property, count) of every aggregate, zero counts included."""
+        for login in self.logins:
+            yield user_iri(login), "commitCount", self.author_commits[login]
+            yield user_iri(login), "repoCount", self.author_repos[login]
+        for key in self.branch_keys:
+            yield branch_iri(*key), "commitCount", self.branch_commits[key]
+        for repo_id in self.repo_ids:
+            yield repo_iri(repo_id), "unmergedBranchCount", self.repo_unmerged[repo_id]
+        for key in self.file_keys:
+            yield file_iri(*key), "modificationCount", self.file_modifications[key]
+
+def derive_aggregates():
+    """Compute the Aggregates of data/*.json without building any individual."""
+    aggregates = Aggregates()
+    aggregates.repo_ids = {r["repo_id"] for r in load_json("repos.json")}
+    aggregates.logins = {u["user_login"] for u in load_json("users.json")}
+    branch_keys = {}   # (repo_id, name) → itself, in branches.json order for BranchResolver
+    for b in load_json("branches.json"):
+        if b["repo_id"] in aggregates.repo_ids:
+            key = (b["repo_id"], b["branch_name"])
+            branch_keys[key] = key
+    aggregates.branch_keys = set(branch_keys)
+
+    # === Commits: authors and branch links ===
+    commits = set()   # shas with an individual, parents included
+    authors = {}      # sha → logins
+    linked = set()    # (branch key, sha) hasCommit links
+    for c in load_json("commits.json"):
+        key = (c["repo_id"], c["branch_name"])
+        if key not in branch_keys:
+            continue
+        sha = c["commit_sha"]
+        commits.add(sha)
+        commits.update(c.get("commit_parents", []))
+        linked.add((key, sha))
+        if c.get("commit_author_login") in aggregates.logins:
+            authors.setdefault(sha, set()).add(c["commit_author_login"])
+    if (DATA_DIR / "commit_branches.json").exists():
+        for m in load_json("commit_branches.json"):
+            key = (m["repo_id"], m["branch_name"])
+            if key in branch_keys and m["commit_sha"] in commits:
+                linked.add((key, m["commit_sha"]))
+    repos_of = {}     # sha → repo ids of its branches
+    for key, sha in linked:
+        aggregates.branch_commits[key] += 1
+        repos_of.setdefault(sha, set()).add(key[0])
+    author_repos = {}
+    for sha, logins in authors.items():
+        for login in logins:
+            aggregates.author_commits[login] += 1
+            author_repos.setdefault(login, set()).update(repos_of.get(sha, ()))
+    aggregates.author_repos.update({login: len(repos) for login, repos in author_repos.items()})
+
+    # === Branches no merged pull request leads out of ===
+    resolver = BranchResolver(branch_keys)
+    merged = {merged_head(resolver, p) for p in load_json("pulls.json") if p["repo_id"] in aggregates.repo_ids}
+    for repo_id, name in branch_keys:
+        if (repo_id, name) not in merged:
+            aggregates.repo_unmerged[repo_id] += 1
+
+    # === Files: one modification per commit (a FileChange) ===
+    changes = set()   # (sha, path)
+    for f in load_json("files.json"):
+        change = (f["commit_sha"], f["file_name"])
+        if change[0] not in commits:
+            continue
+        aggregates.file_keys.add((f["repo_id"], f["file_name"]))
+        if change not in changes:
+            changes.add(change)
+            aggregates.file_modifications[(f["repo_id"], f["file_name"])] += 1
+    return aggregates
+
+def assert_aggregates(onto, aggregates):
+    """Set the aggregate properties in `onto`; values that are already right are left alone."""
+    for name, prop, count in aggregates.values():
+        ind = onto[name]
+        if ind is not None and getattr(ind, prop) != [count]:
+            setattr(ind, prop, [count])
+
+# --------------------------------------------------------
+# === Graph snapshot for the query tools ===
+# --------------------------------------------------------
+def write_snapshot(path, onto=None, ntriples=None):
+    from graph_snapshot import snapshot_ntriples, snapshot_ontology
+    started = time.perf_counter()
+    count = snapshot_ntriples(ntriples, path) if ntriples else snapshot_ontology(onto, path)
+    print(f"✅ Snapshot written: {path} ({count} triples, {time.perf_counter() - started:.1f}s)")
 
 # --------------------------------------------------------
-# === Save populated ontology ===
+# === Entry point ===
 # --------------------------------------------------------
-onto.save(file="ontology/git-onto-logic-populated.owl", format="rdfxml")
-print("✅ Populated ontology saved: ontology/git-onto-logic-populated.owl")
+def main():
+    parser = argparse.ArgumentParser(description="Populate the Git-Onto-Logic ontology from data/*.json")
+    parser.add_argument("--bulk", action="store_true",
+                        help="write N-Triples directly instead of building individuals through owlready2")
+    parser.add_argument("--db", nargs="?", const="ontology/git-onto-logic.sqlite3", metavar="PATH",
+                        help="keep the ontology in a persistent owlready2 quadstore and only apply "
+                             "the rows that changed since the last run")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="with --bulk: build per-repository fragments in N processes")
+    parser.add_argument("--output", help=f"output file (default: {OWL_OUTPUT}, or {NT_OUTPUT} with --bulk)")
+    parser.add_argument("--snapshot", nargs="?", const=SNAPSHOT_OUTPUT, metavar="PATH",
+                        help="also write a memory-mappable graph snapshot for the query tools")
+    args = parser.parse_args()
+    if args.jobs > 1 and not args.bulk:
+        parser.error("--jobs requires --bulk")
+
+    if args.db:
+        from incremental_populate import refresh
+        onto = refresh(args.db, StageReport())
+        if args.snapshot:
+            write_snapshot(args.snapshot, onto=onto)
+        return
+
+    started = time.perf_counter()
+    report = StageReport()
+    if args.bulk:
+        from bulk_populate import write_ntriples, write_ntriples_sharded
+        output = args.output or NT_OUTPUT
+        if args.jobs > 1:
+            count = write_ntriples_sharded(output, args.jobs, report)
+        else:
+            count = write_ntriples(output, report)
+        print(f"✅ Populated ontology written: {output} ({count} triples, {time.perf_counter() - started:.1f}s)")
+        if args.snapshot:
+            write_snapshot(args.snapshot, ntriples=output)
+        return
+
+    # === Load ontology schema ===
+    onto = get_ontology(SCHEMA_FILE).load()
+    report("schema")
+    populate(onto, report)
+
+    # === Save populated ontology ===
+    output = args.output or OWL_OUTPUT
+    onto.save(file=output, format="rdfxml")
+    report("save")
+    print(f"✅ Populated ontology saved: {output} ({time.perf_counter() - started:.1f}s)")
+    if args.snapshot:
+        write_snapshot(args.snapshot, onto=onto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# --------------------------------------------------------
+# SPARQL result cache shared by run_queries.py, the web app and app_cli.py
+# --------------------------------------------------------
+# Results are keyed by (graph version, normalised query text). The graph
+# version is the SHA-256 of the file the store answers from (see
+# GraphStore.version), so a population run that rewrites the graph (or a
+# --db refresh of the quadstore) makes every older entry unreachable, even in
+# a long-running process; LRU eviction then drops them.
+#
+# Entries are evicted least recently used first once the cache holds more
+# than MAX_ENTRIES results or more than MAX_BYTES of them (measured as
+# their pickled size). With GIT_ONTO_QUERY_CACHE set to a file path the
+# cache is loaded from that file and saved back to it at exit, so results
+# survive between runs of the CLI tools.
+import atexit, os, pickle, re, threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 512
+MAX_BYTES = 64 << 20
+
+# Quoted strings and IRIs are kept verbatim; comments and runs of
+# whitespace elsewhere become a single space.
+_TOKEN = re.compile(r'("""(?:[^"\\]|\\.|"(?!""))*"""|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|<[^<>\s]*>)'
+                    r'|(?:#[^\n]*|\s)+')
+
+
+def normalise(query):
+    """Query text with comments dropped and whitespace collapsed outside literals and IRIs."""
+    return _TOKEN.sub(lambda m: m.group(1) or " ", query).strip()
+
+
+class QueryCache:
+    """LRU cache of query result rows, bounded in entries and bytes."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self.entries = OrderedDict()  # (version, query) → (rows, size)
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self.dirty = False
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    def get(self, version, query):
+        """Cached rows for `query` on graph `version`, or None."""
+        key = (version, normalise(query))
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, version, query, rows):
+        size = len(pickle.dumps(rows, pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+        key = (version, normalise(query))
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self.entries[key] = (rows, size)
+            self.bytes += size
+            self.dirty = True
+            self._evict()
+
+    def query(self, store, query):
+        """store.query(query), answered from the cache when the graph has not changed."""
+        version = store.version
+        rows = self.get(version, query)
+        if rows is None:
+            rows = store.query(query)
+            self.put(version, query, rows)
+        return rows
+
+    def _evict(self):
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            _, (_, size) = self.entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.dirty = True
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self.entries), "bytes": self.bytes}
+
+    def summary(self):
+        return (f"{self.hits} hits, {self.misses} misses, {self.evictions} evicted, "
+                f"{len(self.entries)} entries ({self.bytes / 1024:.0f} KB)")
+
+    # === Persistence ===
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                entries = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            print(f"⚠️ {self.path}: ignoring unreadable query cache ({e.__class__.__name__})")
+            return
+        with self._lock:
+            for key, rows, size in entries:
+                self.entries[key] = (rows, size)
+                self.bytes += size
+            self._evict()
+
+    def save(self):
+        """Write the cache to its file, atomically, if it changed since it was loaded."""
+        if not self.path or not self.dirty:
+            return
+        with self._lock:
+            entries = [(key, rows, size) for key, (rows, size) in self.entries.items()]
+            self.dirty = False
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(entries, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+
+_default = None
+
+def default_cache():
+    """The process-wide cache, persisted to GIT_ONTO_QUERY_CACHE when that is set."""
+    global _default
+    if _default is None:
+        _default = QueryCache(path=os.getenv("GIT_ONTO_QUERY_CACHE"))
+        if _default.path:
+            atexit.register(_default.save)
+    return _default
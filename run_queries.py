@@ -2,58 +2,91 @@
 # Git-Onto-Logic : SPARQL Query Suite (Final)
 # Author: Saayella
 # --------------------------------------------------------
-from rdflib import Graph, Namespace
+# Usage:
+#   python run_queries.py                      # one query after another
+#   python run_queries.py --jobs 4             # spread over 4 worker processes
+#   python run_queries.py --check-aggregates   # materialised counts vs raw graph
+#
+# GIT_ONTO_GRAPH / GIT_ONTO_DB say where the populated ontology is,
+# GIT_ONTO_STORE which engine answers the queries (see graph_store.py).
+# With --jobs the workers all map one snapshot of the graph (the graph
+# itself when it is a .snap, else its cached snapshot), so it is parsed at
+# most once and its pages are shared; results still print in suite order.
+# Results come from the query cache (query_cache.py) while the graph is
+# unchanged; set GIT_ONTO_QUERY_CACHE to keep it between runs.
+import argparse, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+from rdflib import Namespace
 from termcolor import colored  # pip install termcolor
 
-# === Load the populated ontology ===
-ONTO_PATH = "ontology/git-onto-logic-populated.owl"
+from graph_snapshot import SNAPSHOT_SUFFIX
+from graph_store import cached_snapshot, default_backend, graph_path, open_store
+from query_cache import default_cache
+
+# Backends whose graph a snapshot can stand in for under --jobs.
+SNAPSHOT_BACKENDS = ("memory", "cached", "snapshot")
 
-g = Graph()
-g.parse(ONTO_PATH, format="xml")
-print(colored(f"✅ Loaded ontology with {len(g)} triples", "green"))
+store = None
 
 # === Define namespace ===
 GIT = Namespace("http://example.org/git-onto-logic#")
 
-# === Helper to run & print results ===
-def run_query(title, query):
+# === Helpers to run & print results ===
+def execute(query):
+    """Run a query on the loaded store, uncached; returns its rows and the wall time."""
+    start = time.perf_counter()
+    rows = store.query(query)
+    return rows, time.perf_counter() - start
+
+
+def print_result(title, rows, elapsed, cached=False):
     print(colored(f"\n🔍 {title}", "cyan"))
     print(colored("-" * (len(title) + 5), "cyan"))
-    results = g.query(query)
-    if len(results) == 0:
+    if len(rows) == 0:
         print(colored("No results found.", "yellow"))
-        return
-    for row in results:
+    for row in rows:
         vals = [str(x).split("#")[-1] for x in row if x]
         print("  •", ", ".join(vals))
+    print(colored(f"  ⏱ {elapsed * 1000:.0f} ms" + (" (cached)" if cached else ""), "blue"))
+
+
+def run_query(title, query):
+    start = time.perf_counter()
+    version = store.version
+    rows = default_cache().get(version, query)
+    cached = rows is not None
+    if not cached:
+        rows = store.query(query)
+        default_cache().put(version, query, rows)
+    print_result(title, rows, time.perf_counter() - start, cached)
+
+
+def _open_worker(backend, path):
+    global store
+    store = open_store(backend, path=path)
+
 
 # === All 14 SPARQL Queries ===
 QUERIES = [
     # 1. Repositories with >5 unmerged branches
     ("Repositories with >5 unmerged branches", """
     PREFIX git: <http://example.org/git-onto-logic#>
-    SELECT ?repo (COUNT(?branch) AS ?unmergedCount)
+    SELECT ?repo ?unmergedCount
     WHERE {
-      ?repo a git:Repository .
-      ?repo git:hasBranch ?branch .
-      ?branch a git:UnmergedBranch .
+      ?repo git:unmergedBranchCount ?unmergedCount .
+      FILTER (?unmergedCount > 5)
     }
-    GROUP BY ?repo
-    HAVING (COUNT(?branch) > 5)
     """),
 
     # 2. Users who contributed to ≥3 repositories
     ("Users who contributed to ≥3 repositories", """
     PREFIX git: <http://example.org/git-onto-logic#>
-    SELECT ?user (COUNT(DISTINCT ?repo) AS ?repoCount)
+    SELECT ?user ?repoCount
     WHERE {
-      ?commit a git:Commit ;
-               git:authoredBy ?user ;
-               git:onBranch ?branch .
-      ?repo git:hasBranch ?branch .
+      ?user git:repoCount ?repoCount .
+      FILTER (?repoCount >= 3)
     }
-    GROUP BY ?user
-    HAVING (COUNT(DISTINCT ?repo) >= 3)
     """),
 
     # 3. Merge commits (inferred)
@@ -69,7 +102,7 @@ QUERIES = [
     SELECT ?commit ?branch
     WHERE {
       ?commit a git:SecurityCommit ;
-               git:onBranch ?branch .
+               ^git:hasCommit ?branch .
     }
     """),
 
@@ -111,12 +144,12 @@ QUERIES = [
     # 8. Top 5 most active contributors
     ("Top 5 most active contributors", """
     PREFIX git: <http://example.org/git-onto-logic#>
-    SELECT ?user (COUNT(?commit) AS ?commitCount)
+    SELECT ?user ?commitCount
     WHERE {
-      ?commit a git:Commit ;
-               git:authoredBy ?user .
+      ?user a git:User ;
+            git:commitCount ?commitCount .
+      FILTER (?commitCount > 0)
     }
-    GROUP BY ?user
     ORDER BY DESC(?commitCount)
     LIMIT 5
     """),
@@ -147,24 +180,21 @@ QUERIES = [
     PREFIX git: <http://example.org/git-onto-logic#>
     SELECT (AVG(?commitCount) AS ?averageCommits)
     WHERE {
-      SELECT ?branch (COUNT(?commit) AS ?commitCount)
-      WHERE {
-        ?branch a git:Branch .
-        ?branch git:hasCommit ?commit .
-      }
-      GROUP BY ?branch
+      ?branch a git:Branch ;
+              git:commitCount ?commitCount .
+      FILTER (?commitCount > 0)
     }
     """),
 
     # 12. Top 10 most frequently modified files
     ("Top 10 most frequently modified files", """
     PREFIX git: <http://example.org/git-onto-logic#>
-    SELECT ?file (COUNT(?commit) AS ?timesModified)
+    SELECT ?file ?fileName ?timesModified
     WHERE {
-      ?commit a git:Commit ;
-               git:updatesFile ?file .
+      ?file git:modificationCount ?timesModified ;
+            git:fileName ?fileName .
+      FILTER (?timesModified > 0)
     }
-    GROUP BY ?file
     ORDER BY DESC(?timesModified)
     LIMIT 10
     """),
@@ -190,8 +220,142 @@ QUERIES = [
     """),
 ]
 
+# === Materialised aggregates (see populate_graph.py) ===
+# Queries 1, 2, 8, 11 and 12 read counts stored at population time.
+# --check-aggregates recounts each from the raw triples: (name, raw count
+# per individual, stored count per individual).
+AGGREGATE_CHECKS = [
+    ("commits per author", """
+    PREFIX git: <http://example.org/git-onto-logic#>
+    SELECT ?user (COUNT(DISTINCT ?commit) AS ?n)
+    WHERE { ?commit a git:Commit ; git:authoredBy ?user . }
+    GROUP BY ?user
+    """, """
+    PREFIX git: <http://example.org/git-onto-logic#>
+    SELECT ?user ?n WHERE { ?user a git:User ; git:commitCount ?n . }
+    """),
+    ("repositories per author", """
+    PREFIX git: <http://example.org/git-onto-logic#>
+    SELECT ?user (COUNT(DISTINCT ?repo) AS ?n)
+    WHERE {
+      ?commit a git:Commit ;
+               git:authoredBy ?user ;
+               ^git:hasCommit ?branch .
+      ?repo git:hasBranch ?branch .
+    }
+    GROUP BY ?user
+    """, """
+    PREFIX git: <http://example.org/git-onto-logic#>
+    SELECT ?user ?n WHERE { ?user git:repoCount ?n . }
+    """),
+    ("commits per branch", """
+    PREFIX git: <http://example.org/git-onto-logic#>
+    SELECT ?branch (COUNT(DISTINCT ?commit) AS ?n)
+    WHERE { ?branch a git:Branch ; git:hasCommit ?commit . }
+    GROUP BY ?branch
+    """, """
+    PREFIX git: <http://example.org/git-onto-logic#>
+    SELECT ?branch ?n WHERE { ?branch a git:Branch ; git:commitCount ?n . }
+    """),
+    ("unmerged branches per repository", """
+    PREFIX git: <http://example.org/git-onto-logic#>
+    SELECT ?repo (COUNT(DISTINCT ?branch) AS ?n)
+    WHERE { ?repo a git:Repository ; git:hasBranch ?branch . ?branch a git:UnmergedBranch . }
+    GROUP BY ?repo
+    """, """
+    PREFIX git: <http://example.org/git-onto-logic#>
+    SELECT ?repo ?n WHERE { ?repo git:unmergedBranchCount ?n . }
+    """),
+    ("modifications per file", """
+    PREFIX git: <http://example.org/git-onto-logic#>
+    SELECT ?file (COUNT(DISTINCT ?commit) AS ?n)
+    WHERE { ?change git:ofFile ?file ; git:inCommit ?commit . }
+    GROUP BY ?file
+    """, """
+    PREFIX git: <http://example.org/git-onto-logic#>
+    SELECT ?file ?n WHERE { ?file git:modificationCount ?n . }
+    """),
+]
+
+HAS_AGGREGATES = """
+PREFIX git: <http://example.org/git-onto-logic#>
+ASK { ?s git:commitCount ?n . }
+"""
+
+
+def check_aggregates():
+    """Compare every stored count with its recount from the raw graph; returns the mismatch count.
+
+    An individual without a stored count must have a raw count of 0.
+    """
+    mismatches = 0
+    for name, raw, stored in AGGREGATE_CHECKS:
+        expected = {row[0]: int(row[1]) for row in store.query(raw)}
+        actual = {row[0]: int(row[1]) for row in store.query(stored)}
+        wrong = sorted(s for s in expected.keys() | actual.keys() if expected.get(s, 0) != actual.get(s, 0))
+        mismatches += len(wrong)
+        if not wrong:
+            print(colored(f"✅ {name}: {len(actual)} counts match the graph", "green"))
+            continue
+        print(colored(f"❌ {name}: {len(wrong)} of {len(actual)} counts differ from the graph", "red"))
+        for s in wrong[:5]:
+            print(f"  • {str(s).split('#')[-1]}: stored {actual.get(s, '(none)')}, graph {expected.get(s, 0)}")
+    return mismatches
+
 # === Run all queries ===
-for title, query in QUERIES:
-    run_query(title, query)
+def main():
+    global store
+    parser = argparse.ArgumentParser(description="Run the Git-Onto-Logic SPARQL query suite")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="run the queries in N worker processes sharing one graph snapshot")
+    parser.add_argument("--check-aggregates", action="store_true",
+                        help="check the counts materialised by populate_graph.py against the raw graph")
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    started = time.perf_counter()
+    if args.check_aggregates or args.jobs == 1:
+        store = open_store()
+        print(colored(f"✅ Loaded ontology with {len(store)} triples ({store.backend})", "green"))
+    else:
+        if default_backend() not in SNAPSHOT_BACKENDS:
+            parser.error(f"--jobs needs a graph file (GIT_ONTO_STORE one of: {', '.join(SNAPSHOT_BACKENDS)})")
+        path = graph_path()
+        snap = path if path.endswith(SNAPSHOT_SUFFIX) else cached_snapshot(path)
+        store = open_store("snapshot", path=snap)
+        print(colored(f"✅ Loaded ontology with {len(store)} triples (snapshot, {args.jobs} jobs)", "green"))
+    if args.check_aggregates:
+        sys.exit(1 if check_aggregates() else 0)
+    if not store.query(HAS_AGGREGATES)[0][0]:
+        print(colored("⚠️ The graph has no materialised counts; queries 1, 2, 8, 11 and 12 need a graph "
+                      "written by the current populate_graph.py.", "yellow"))
+
+    if args.jobs == 1:
+        for title, query in QUERIES:
+            run_query(title, query)
+    else:
+        # Cached results are printed straight away; only the misses go to the workers.
+        cache = default_cache()
+        with ProcessPoolExecutor(max_workers=args.jobs, initializer=_open_worker,
+                                 initargs=("snapshot", snap)) as pool:
+            futures = []
+            for _, query in QUERIES:
+                start = time.perf_counter()
+                rows = cache.get(store.version, query)
+                futures.append(pool.submit(execute, query) if rows is None
+                               else (rows, time.perf_counter() - start))
+            for (title, query), future in zip(QUERIES, futures):
+                if isinstance(future, tuple):
+                    print_result(title, *future, cached=True)
+                else:
+                    rows, elapsed = future.result()
+                    cache.put(store.version, query, rows)
+                    print_result(title, rows, elapsed)
+
+    print(colored(f"\n📦 Query cache: {default_cache().summary()}", "blue"))
+    print(colored(f"\n✅ All SPARQL queries executed successfully ({time.perf_counter() - started:.2f}s).", "green"))
+
 
-print(colored("\n✅ All SPARQL queries executed successfully.", "green"))
+if __name__ == "__main__":
+    main()
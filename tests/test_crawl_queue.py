@@ -0,0 +1,24 @@
+import crawl_queue
+from crawl_queue import MAX_ATTEMPTS, WorkQueue
+
+
+def test_task_whose_lease_keeps_expiring_fails(tmp_path, monkeypatch):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+    queue.put("repo", {"repo": "o/r"})
+    monkeypatch.setattr(crawl_queue, "LEASE_SECONDS", -1)  # every lease is already expired
+    for _ in range(MAX_ATTEMPTS):
+        assert queue.claim("worker") is not None
+    assert queue.claim("worker") is None
+    assert queue.unfinished() == {"failed": 1}
+    assert queue.active() == 0
+
+
+def test_expired_lease_is_reclaimed(tmp_path, monkeypatch):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+    queue.put("repo", {"repo": "o/r"})
+    monkeypatch.setattr(crawl_queue, "LEASE_SECONDS", -1)
+    task_id, _, _ = queue.claim("dead")
+    assert queue.claim("alive")[0] == task_id
+    assert not queue.complete(task_id, "dead", [], [])
+    assert queue.complete(task_id, "alive", [], [])
+    assert queue.unfinished() == {}
@@ -0,0 +1,84 @@
+import json, subprocess, sys
+
+import pytest
+
+import data_io
+from data_io import iter_records, peak_rss_mb, write_json, write_ndjson
+
+ROWS = [
+    {"n": 1, "s": "]", "nested": [1, [2, {"x": "}"}]]},
+    {"n": -12.5e3, "s": 'quote " and \\ backslash', "u": "café ✓"},
+    {"n": 123456789, "s": "", "empty": [], "none": None},
+    [],
+    "text",
+    42,
+]
+
+
+def write(tmp_path, text, name="rows.json"):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 7, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_array_elements_split_across_chunks(tmp_path, monkeypatch, chunk, indent):
+    monkeypatch.setattr(data_io, "READ_CHUNK", chunk)
+    path = write(tmp_path, json.dumps(ROWS, indent=indent, ensure_ascii=False))
+    assert list(iter_records(path)) == ROWS
+
+
+@pytest.mark.parametrize("text", ["", "  \n\t", "[]", " [ \n ] ", "\n\n"])
+def test_empty_files(tmp_path, text):
+    assert list(iter_records(write(tmp_path, text))) == []
+
+
+def test_ndjson_skips_blank_lines(tmp_path):
+    text = "\n".join(json.dumps(row) for row in ROWS[:3])
+    path = write(tmp_path, f"\n{text}\n\n")
+    assert list(iter_records(path)) == ROWS[:3]
+
+
+def test_ndjson_torn_last_line_is_ignored(tmp_path, capsys):
+    path = write(tmp_path, '{"a": 1}\n{"a": 2}\n{"a": ')
+    assert list(iter_records(path)) == [{"a": 1}, {"a": 2}]
+    assert "truncated" in capsys.readouterr().out
+
+
+def test_ndjson_malformed_line_raises(tmp_path):
+    path = write(tmp_path, '{"a": 1}\n{"a": \n{"a": 3}\n')
+    with pytest.raises(ValueError):
+        list(iter_records(path))
+
+
+@pytest.mark.parametrize("text", ['[{"a": 1}, {"a": 2}', '[{"a": 1}, {"a": ', "[1, 2", '[1, 2, '])
+def test_broken_array_raises(tmp_path, monkeypatch, text):
+    monkeypatch.setattr(data_io, "READ_CHUNK", 4)
+    with pytest.raises(ValueError):
+        list(iter_records(write(tmp_path, text)))
+
+
+def test_number_at_chunk_end_is_not_cut(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_io, "READ_CHUNK", 4)
+    path = write(tmp_path, "[123,4567,89]")
+    assert list(iter_records(path)) == [123, 4567, 89]
+
+
+@pytest.mark.parametrize("writer", [write_json, write_ndjson])
+def test_writers_round_trip(tmp_path, writer):
+    path = tmp_path / "rows.json"
+    assert writer(path, iter(ROWS)) == len(ROWS)
+    assert list(iter_records(path)) == ROWS
+    assert not (tmp_path / "rows.json.tmp").exists()
+
+
+def test_peak_rss_is_reported_in_mb():
+    # ru_maxrss is in KB on Linux; any Python process needs well over 1 MB.
+    assert 1 < peak_rss_mb() < 1 << 20
+
+
+def test_peak_rss_of_finished_children():
+    subprocess.run([sys.executable, "-c", "b = bytearray(96 << 20); b[::4096] = bytes(len(b) // 4096)"],
+                   check=True)
+    assert peak_rss_mb(children=True) >= 64
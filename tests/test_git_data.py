@@ -0,0 +1,127 @@
+import json, re
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import git_data as gd
+
+
+class Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = {}
+
+    def json(self):
+        return self.body
+
+
+class FakeGitHub:
+    """Just enough of the API for one repo, o/r: commits form a DAG with dates."""
+
+    def __init__(self):
+        self.commits = {}   # sha → (parents, date)
+        self.branches = {}  # name → head sha
+
+    def commit(self, sha, parents, day):
+        self.commits[sha] = (parents, f"2020-01-{day:02d}T00:00:00Z")
+
+    def ancestors(self, sha):
+        seen, todo = set(), [sha]
+        while todo:
+            sha = todo.pop()
+            if sha not in seen:
+                seen.add(sha)
+                todo.extend(self.commits[sha][0])
+        return seen
+
+    def listed(self, sha):
+        user = {"login": "alice", "id": 1, "html_url": "https://github.com/alice"}
+        date = self.commits[sha][1]
+        return {"sha": sha, "commit": {"message": sha, "author": {"date": date}, "committer": {"date": date}},
+                "author": user, "committer": user}
+
+    def get(self, url, headers=None, **kwargs):
+        parsed = urlparse(url)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        path = parsed.path
+        if path == "/repos/o/r":
+            return Response(200, {"id": 7, "full_name": "o/r", "html_url": "h", "default_branch": "main"})
+        if path == "/repos/o/r/branches":
+            return Response(200, [{"name": b, "commit": {"sha": sha}} for b, sha in self.branches.items()]
+                            if query.get("page") == "1" else [])
+        if path in ("/repos/o/r/issues", "/repos/o/r/pulls"):
+            return Response(200, [])
+        m = re.fullmatch(r"/repos/o/r/commits/(\w+)", path)
+        if m:
+            sha = m.group(1)
+            detail = self.listed(sha)
+            detail["parents"] = [{"sha": p} for p in self.commits[sha][0]]
+            detail["files"] = []
+            return Response(200, detail)
+        if path == "/repos/o/r/commits":
+            # Newest committer date first, like the real listing.
+            shas = sorted(self.ancestors(self.branches.get(query["sha"], query["sha"])),
+                          key=lambda sha: self.commits[sha][1], reverse=True)
+            if "since" in query:
+                shas = [sha for sha in shas if self.commits[sha][1] >= query["since"]]
+            return Response(200, [self.listed(sha) for sha in shas] if query.get("page") == "1" else [])
+        m = re.fullmatch(r"/repos/o/r/compare/(\w+)\.\.\.(\w+)", path)
+        if m:
+            base, head = m.groups()
+            if base not in self.ancestors(head):
+                return Response(200, {"status": "diverged", "commits": []})
+            new = self.ancestors(head) - self.ancestors(base)
+            shas = sorted(new, key=lambda sha: self.commits[sha][1])
+            return Response(200, {"status": "ahead", "commits": [self.listed(sha) for sha in shas]}
+                            if query.get("page") == "1" else {})
+        return Response(404)
+
+
+@pytest.fixture
+def github(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake = FakeGitHub()
+    monkeypatch.setattr(gd, "REPOS", ["o/r"])
+    monkeypatch.setattr(gd.SESSION, "get", fake.get)
+    monkeypatch.setattr(gd.CACHE, "root", None)
+    monkeypatch.setattr(gd.SCHEDULER, "rate", 1000.0)
+    monkeypatch.setattr(gd.SCHEDULER, "ceiling", 1000.0)
+    return fake
+
+
+def crawled(kind):
+    with open(gd.OUTPUT_FILES[kind]) as f:
+        return sorted(json.dumps(row, sort_keys=True) for row in json.load(f))
+
+
+def test_sync_picks_up_merged_commits_older_than_the_watermark(github):
+    for day in range(1, 6):
+        github.commit(f"c{day}", [f"c{day - 1}"] if day > 1 else [], day + 10)
+    github.branches["main"] = "c5"
+    gd.main()
+
+    # A side branch started before the watermark is merged in: its commits
+    # are dated before c5, so a date-filtered listing would skip them.
+    github.commit("f1", ["c2"], 12)
+    github.commit("f2", ["f1"], 13)
+    github.commit("m", ["c5", "f2"], 20)
+    github.branches["main"] = "m"
+    gd.main(sync=True)
+    synced = {kind: crawled(kind) for kind in ("commits", "commit_branches")}
+
+    gd.main()
+    assert synced == {kind: crawled(kind) for kind in ("commits", "commit_branches")}
+    assert len(synced["commits"]) == 8
+
+
+def test_sync_relists_a_force_pushed_branch(github):
+    github.commit("a", [], 1)
+    github.commit("b", ["a"], 2)
+    github.branches["main"] = "b"
+    gd.main()
+
+    github.commit("b2", ["a"], 3)
+    github.branches["main"] = "b2"
+    gd.main(sync=True)
+    assert [json.loads(row)["commit_sha"] for row in crawled("commits")] == ["a", "b", "b2"]
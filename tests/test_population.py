@@ -0,0 +1,167 @@
+import json, os, random, shutil, subprocess, sys
+
+import pytest
+from rdflib import BNode, Graph
+from rdflib.compare import isomorphic
+
+from conftest import ROOT
+from populate_graph import DEFAULT_BRANCH_NAMES, BranchResolver
+
+SCHEMA = os.path.join(ROOT, "ontology", "git-onto-logic-redesigned.owl")
+USERS = [f"user{i}" for i in range(6)]
+
+
+def generate(data, repos=2, branches=4, commits=40, seed=0):
+    """Write a small random crawl to data/*.json."""
+    rng = random.Random(seed)
+    rows = {kind: [] for kind in ("repos", "branches", "commits", "users", "files",
+                                  "issues", "pulls", "commit_branches")}
+    for r in range(repos):
+        repo_id = 1000 + r
+        rows["repos"].append({"repo_id": repo_id, "repo_name": f"org/repo{r}", "repo_description": "d",
+                              "repo_language": rng.choice(["Python", None]), "repo_stars": r,
+                              "repo_forks": 1, "repo_url": f"https://github.com/org/repo{r}"})
+        rows["users"].extend({"user_login": u, "repo_id": repo_id, "user_id": i,
+                              "user_url": f"https://github.com/{u}"} for i, u in enumerate(USERS))
+        names = ["main"] + [f"feature/f{i}" for i in range(branches - 1)]
+        shas = []
+        for k in range(commits):
+            sha = f"{repo_id:08x}{k:032x}"
+            parents = shas[-1:] + (shas[-3:-2] if k % 7 == 5 else [])
+            rows["commits"].append({
+                "repo_id": repo_id, "branch_name": rng.choice(names), "commit_sha": sha,
+                "commit_message": rng.choice(["fix bug", "Security patch", "refactor", "docs\n\nmore"]),
+                "commit_date": f"2020-01-{1 + k % 28:02d}T00:00:00Z",
+                "commit_author_login": rng.choice(USERS + [""]),
+                "commit_committer_login": rng.choice(USERS),
+                "commit_parent_count": len(parents), "commit_parents": parents, "is_initial": not parents})
+            rows["commit_branches"].extend({"repo_id": repo_id, "branch_name": name, "commit_sha": sha}
+                                           for name in rng.sample(names, 2))
+            rows["files"].extend({"repo_id": repo_id, "commit_sha": sha,
+                                  "file_name": rng.choice(["src/a.py", "README.md", "src/b c.py"]),
+                                  "file_status": "modified", "file_additions": 1, "file_deletions": 2,
+                                  "file_changes": 3} for _ in range(rng.randint(0, 2)))
+            shas.append(sha)
+        rows["branches"].extend({"repo_id": repo_id, "branch_name": name, "commit_sha": shas[-1],
+                                 "is_default": name == "main"} for name in names)
+        for i in range(8):
+            rows["issues"].append({"repo_id": repo_id, "issue_id": repo_id * 100 + i, "issue_number": i,
+                                   "title": f'issue "{i}"', "state": rng.choice(["open", "closed"]),
+                                   "user_login": rng.choice(USERS)})
+            rows["pulls"].append({"repo_id": repo_id, "pr_id": repo_id * 100 + i, "number": i,
+                                  "title": f"pr {i}", "state": rng.choice(["open", "closed"]),
+                                  "merged_at": rng.choice([None, "2020-02-02T00:00:00Z"]),
+                                  "user_login": rng.choice(USERS),
+                                  "base_branch": rng.choice(["main", "MAIN", ""]),
+                                  "head_branch": rng.choice(["f1", "feature/f2", "nomatch", None])})
+    os.makedirs(data, exist_ok=True)
+    for kind, kind_rows in rows.items():
+        with open(os.path.join(data, f"{kind}.json"), "w") as f:
+            json.dump(kind_rows, f)
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    os.makedirs(tmp_path / "ontology")
+    shutil.copy(SCHEMA, tmp_path / "ontology")
+    generate(str(tmp_path / "data"))
+    return tmp_path
+
+
+def populate(workdir, *args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    subprocess.run([sys.executable, os.path.join(ROOT, "populate_graph.py"), *args],
+                   cwd=workdir, env=env, check=True, capture_output=True)
+
+
+def load(path):
+    g = Graph()
+    g.parse(str(path))
+    return g
+
+
+def test_bulk_matches_owlready(workdir):
+    populate(workdir, "--output", "ontology/owlready.owl")
+    populate(workdir, "--bulk", "--output", "ontology/bulk.nt")
+    populate(workdir, "--bulk", "--jobs", "2", "--output", "ontology/sharded.nt")
+    owlready = load(workdir / "ontology/owlready.owl")
+    assert isomorphic(owlready, load(workdir / "ontology/bulk.nt"))
+    assert isomorphic(owlready, load(workdir / "ontology/sharded.nt"))
+
+
+def quadstore_triples(db):
+    # owlready2's rdflib view also reports the onBranch inverse of every
+    # stored hasCommit, which the saved file leaves implicit.
+    code = (f"from owlready2 import World\n"
+            f"w = World(); w.set_backend(filename={db!r})\n"
+            f"print(w.as_rdflib_graph().serialize(format='nt'))")
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    g = Graph()
+    g.parse(data=out, format="nt")
+    return g
+
+
+def named(g):
+    return {t for t in g if not any(isinstance(term, BNode) for term in t)
+            and not str(t[1]).endswith("#onBranch")}
+
+
+def test_db_refresh_matches_fresh_build(workdir):
+    db = str(workdir / "ontology/store.sqlite3")
+    populate(workdir, "--db", db)
+
+    data = workdir / "data"
+    def rows(kind):
+        with open(data / f"{kind}.json") as f:
+            return json.load(f)
+    def save(kind, kind_rows):
+        with open(data / f"{kind}.json", "w") as f:
+            json.dump(kind_rows, f)
+    commits, pulls = rows("commits"), rows("pulls")
+    gone = {c["commit_sha"] for c in commits[10:15]}
+    unlinked = {(c["commit_sha"], c["branch_name"]) for c in commits[20:25]}
+    save("commits", [dict(c, commit_message="security fix") if i < 5 else
+                     dict(c, commit_author_login=USERS[i % 2]) if i < 8 else c
+                     for i, c in enumerate(commits) if c["commit_sha"] not in gone])
+    save("files", [f for f in rows("files") if f["commit_sha"] not in gone]
+                  + [dict(rows("files")[0], commit_sha=commits[30]["commit_sha"], file_name="NEW.md")])
+    # Memberships other than a commit's own branch go, so those commits are not rebuilt.
+    save("commit_branches", [m for m in rows("commit_branches") if m["commit_sha"] not in gone
+                             and not any(m["commit_sha"] == sha and m["branch_name"] != name
+                                         for sha, name in unlinked)])
+    save("branches", [b for b in rows("branches") if b["branch_name"] != "feature/f2"])
+    save("pulls", [dict(p, merged_at=None if p["merged_at"] else "2021-01-01T00:00:00Z") for p in pulls[2:]])
+    populate(workdir, "--db", db)
+
+    populate(workdir, "--output", "ontology/fresh.owl")
+    assert named(quadstore_triples(db)) == named(load(workdir / "ontology/fresh.owl"))
+
+
+def naive_resolve(branch_map, repo_id, name, role):
+    """BranchResolver's rules, applied by scanning branch_map in order."""
+    names = [(n.lower(), b) for (r, n), b in branch_map.items() if r == repo_id]
+    exact = [b for n, b in names if n == name]
+    if exact:
+        return exact[-1]
+    partial = [b for n, b in names if name in n]
+    if partial:
+        return partial[0]
+    wanted = (lambda n: n in DEFAULT_BRANCH_NAMES) if role == "base" else (lambda n: n not in DEFAULT_BRANCH_NAMES)
+    return next((b for n, b in names if wanted(n)), None)
+
+
+def test_branch_resolver_matches_naive_scan():
+    rng = random.Random(1)
+    words = ["main", "master", "dev", "feature", "fix", "Main", "a", "ab"]
+    branch_map = {}
+    for repo_id in range(5):
+        for _ in range(rng.randint(0, 8)):
+            name = "/".join(rng.sample(words, rng.randint(1, 2)))
+            branch_map[(repo_id, name)] = (repo_id, name)
+    resolver = BranchResolver(branch_map)
+    queries = words + ["", "/", "b", "in", "feature/", "nomatch"]
+    for repo_id in range(6):
+        for name in queries:
+            for role in ("base", "head"):
+                name = name.lower()
+                assert resolver.resolve(repo_id, name, role) == naive_resolve(branch_map, repo_id, name, role)
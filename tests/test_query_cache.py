@@ -0,0 +1,128 @@
+import pytest
+from owlready2 import World
+
+from graph_store import OwlreadyStore, open_store
+from query_cache import QueryCache, normalise
+
+COUNT = "SELECT (COUNT(*) AS ?n) WHERE { ?s ?p ?o }"
+
+
+def count(cache, store):
+    return int(cache.query(store, COUNT)[0][0])
+
+
+def test_normalise_drops_comments_and_whitespace_outside_literals():
+    query = "SELECT  ?s\n# a comment\nWHERE { ?s ?p  'a  # b' . ?s ?q <http://x/#a> }"
+    assert normalise(query) == "SELECT ?s WHERE { ?s ?p 'a  # b' . ?s ?q <http://x/#a> }"
+
+
+def test_entries_are_keyed_by_version_and_normalised_query():
+    cache = QueryCache()
+    cache.put("v1", "SELECT * {}", [(1,)])
+    assert cache.get("v1", "SELECT  *\n{}  # same query") == [(1,)]
+    assert cache.get("v2", "SELECT * {}") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = QueryCache(max_entries=2)
+    cache.put("v", "a", ["a"])
+    cache.put("v", "b", ["b"])
+    cache.get("v", "a")
+    cache.put("v", "c", ["c"])
+    assert cache.get("v", "b") is None
+    assert cache.get("v", "a") == ["a"] and cache.get("v", "c") == ["c"]
+    assert cache.evictions == 1
+
+
+def test_byte_bound(tmp_path):
+    cache = QueryCache(max_bytes=200)
+    cache.put("v", "huge", ["x" * 500])
+    assert cache.get("v", "huge") is None
+    for q in "abcd":
+        cache.put("v", q, [q * 60])
+    assert 0 < cache.bytes <= 200 and cache.evictions
+
+
+def test_saved_cache_is_reloaded(tmp_path):
+    path = str(tmp_path / "cache.pickle")
+    cache = QueryCache(path=path)
+    cache.put("v", "SELECT * {}", [(1,)])
+    cache.save()
+    assert QueryCache(path=path).get("v", "SELECT * {}") == [(1,)]
+
+
+def test_unreadable_cache_file_is_ignored(tmp_path, capsys):
+    path = tmp_path / "cache.pickle"
+    path.write_bytes(b"not a pickle")
+    assert QueryCache(path=str(path)).entries == {}
+    assert "ignoring" in capsys.readouterr().out
+
+
+def test_repeated_query_is_served_from_cache(tmp_path):
+    path = str(tmp_path / "graph.nt")
+    with open(path, "w") as f:
+        f.write("<http://x/a> <http://x/p> <http://x/b> .\n")
+    cache = QueryCache()
+    store = open_store("memory", path=path)
+    assert count(cache, store) == 1
+    assert count(cache, store) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.parametrize("backend", ["memory", "cached"])
+def test_rewritten_graph_file_is_not_served_from_cache(tmp_path, backend):
+    path = str(tmp_path / "graph.nt")
+    with open(path, "w") as f:
+        f.write("<http://x/a> <http://x/p> <http://x/b> .\n")
+    cache = QueryCache()
+    store = open_store(backend, path=path)
+    assert count(cache, store) == 1
+
+    with open(path, "a") as f:
+        f.write("<http://x/a> <http://x/p> <http://x/c> .\n")
+    assert count(cache, store) == 2
+    assert count(cache, store) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_quadstore_update_is_not_served_from_cache(tmp_path):
+    db = str(tmp_path / "graph.sqlite3")
+    world = World()
+    world.set_backend(filename=db, exclusive=False)
+    onto = world.get_ontology("http://x/onto#")
+    with onto:
+        Thing = world["http://www.w3.org/2002/07/owl#Thing"]
+        Thing("first")
+    world.save()
+    cache = QueryCache()
+    store = OwlreadyStore(world, db, live=True)
+    before = count(cache, store)
+    assert count(cache, store) == before
+    assert cache.hits == 1
+
+    with onto:
+        Thing("second")
+    world.save()
+    assert count(cache, store) > before
+    assert cache.misses == 2
+
+
+def test_unchanged_source_is_not_rehashed(tmp_path, monkeypatch):
+    import graph_store
+    path = str(tmp_path / "graph.nt")
+    with open(path, "w") as f:
+        f.write("<http://x/a> <http://x/p> <http://x/b> .\n")
+    store = open_store("memory", path=path)
+    version = store.version
+    monkeypatch.setattr(graph_store, "file_hash", lambda path: 1 / 0)
+    assert store.version == version
+
+
+def test_stores_do_not_share_a_lock(tmp_path):
+    path = str(tmp_path / "graph.nt")
+    with open(path, "w") as f:
+        f.write("<http://x/a> <http://x/p> <http://x/b> .\n")
+    first, second = open_store("memory", path=path), open_store("memory", path=path)
+    with first._lock:
+        assert second.version  # would deadlock on a shared lock
@@ -1,10 +1,19 @@
 # --------------------------------------------------------
 # Validate Git-Onto-Logic Graph using pySHACL
 # --------------------------------------------------------
+import os
 from pyshacl import validate
 from rdflib import Graph
+from rdflib.util import guess_format
 
-data_graph = Graph().parse("ontology/git-onto-logic-populated.owl", format="xml")
+from graph_snapshot import SNAPSHOT_SUFFIX, open_snapshot
+
+# Same GIT_ONTO_GRAPH as run_queries.py: RDF/XML, N-Triples or a .snap snapshot
+data_path = os.getenv("GIT_ONTO_GRAPH", "ontology/git-onto-logic-populated.owl")
+if data_path.endswith(SNAPSHOT_SUFFIX):
+    data_graph = open_snapshot(data_path)
+else:
+    data_graph = Graph().parse(data_path, format=guess_format(data_path) or "xml")
 shapes_graph = Graph().parse("ontology/git-onto-logic-shapes.ttl", format="turtle")
 
 results = validate(